@@ -4,4 +4,5 @@ from class_based_views.detail import DetailView
 from class_based_views.dates import (ArchiveView, YearView, MonthView,
                                      WeekView, DayView, TodayView,
                                      DateDetailView)
-from class_based_views.edit import CreateView, UpdateView, DeleteView
+from class_based_views.edit import (CreateView, UpdateView, DeleteView,
+                                    BulkCreateView, BulkUpdateView)
@@ -1,10 +1,56 @@
+import Queue
 import copy
+import datetime
+import logging
+import sys
+import threading
 from django import http
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
-from django.template import RequestContext, loader
+from django.db import connections, transaction
+from django.template import RequestContext, TextNode, VariableDoesNotExist, loader
+from django.template.defaulttags import ForNode
+from django.template.loader_tags import (BLOCK_CONTEXT_KEY, BlockContext,
+                                         BlockNode, ExtendsNode)
+from django.utils.encoding import force_unicode, smart_str
+from django.utils.hashcompat import md5_constructor
+from django.utils.http import parse_etags, parse_http_date_safe
 from django.utils.translation import ugettext_lazy as _
 
-from utils import coerce_put_post
+from instrumentation import dispatch_instrumented
+from utils import LazyDict, coerce_put_post, get_not_modified_response, wants_json
+
+# Compiled templates, keyed by the tuple of candidate names they were selected
+# from. See TemplateView.load_template().
+_template_cache = {}
+
+def clear_template_cache():
+    """
+    Empty the cache of compiled templates used by ``TemplateView``.
+    """
+    _template_cache.clear()
+
+def _load_parents(template):
+    """
+    Helper: replace the name in a template's constant ``{% extends %}`` tag
+    with the compiled parent template, and so on up the chain, so that
+    ``ExtendsNode.get_parent()`` doesn't load the parent on every render.
+    """
+    for node in template.nodelist:
+        if isinstance(node, ExtendsNode):
+            if node.parent_name_expr is None and isinstance(node.parent_name, basestring):
+                parent = loader.get_template(node.parent_name)
+                _load_parents(parent)
+                node.parent_name = parent
+            break
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised in debug mode when a view runs more queries than its
+    ``max_queries`` budget allows.
+    """
+    
 
 class View(object):
     """
@@ -13,6 +59,12 @@ class View(object):
     """
     
     method_names = ['GET', 'POST', 'PUT', 'DELETE', 'HEAD', 'OPTIONS', 'TRACE']
+    instrumentation_sinks = ()
+    max_queries = None
+    query_budget_action = 'raise'
+    instrumented_stages = ('dispatch', 'get_queryset', 'get_object', 'get_dated_items',
+                           'get_context', 'get_template_names', 'load_template',
+                           'render', 'get_response')
     
     def __init__(self, *args, **kwargs):
         """
@@ -21,16 +73,24 @@ class View(object):
         """
         # Go through keyword arguments, and either save their values to our
         # instance, or raise an error.
+        self._check_initkwargs(kwargs)
         for key, value in kwargs.items():
-            if key in self.method_names:
+            setattr(self, key, value)
+    
+    @classmethod
+    def _check_initkwargs(cls, initkwargs):
+        """
+        Raises ``TypeError`` if any of the given keyword arguments can't be
+        set on an instance of this class.
+        """
+        for key in initkwargs:
+            if key in cls.method_names:
                 raise TypeError(u"You tried to pass in the %s method name as a "
                                 u"keyword argument to %s(). Don't do that." 
-                                % (key, self.__class__.__name__))
-            if hasattr(self, key):
-                setattr(self, key, value)
-            else:
+                                % (key, cls.__name__))
+            if not hasattr(cls, key):
                 raise TypeError(u"%s() received an invalid keyword %r" % (
-                    self.__class__.__name__,
+                    cls.__name__,
                     key,
                 ))
     
@@ -38,37 +98,152 @@ class View(object):
     def as_view(cls, *initargs, **initkwargs):
         """
         Main entry point for a request-response process.
+        
+        If ``instrumentation_sinks`` is set, each request records the time
+        taken by the stages in ``instrumented_stages``; see
+        ``class_based_views.instrumentation``. If ``max_queries`` is set and
+        ``DEBUG`` is on, the queries run by each request are checked with
+        ``check_query_budget()``.
         """
-        def view(request, *args, **kwargs):
-            self = cls(*initargs, **initkwargs)
-            return self.dispatch(request, *args, **kwargs)
+        # Resolve the handlers and check the keyword arguments up front so
+        # that this cost is paid once per URLconf entry rather than once per
+        # request.
+        cls._get_handlers()
+        cls._check_initkwargs(initkwargs)
+        fast = cls.__init__ == View.__init__ and not [
+            key for key in initkwargs if _is_data_descriptor(cls, key)]
+        if fast:
+            # The constructor would only repeat the checks above, so skip it
+            # and copy the (already validated) attributes straight in. Not
+            # when one of them is a property or other descriptor, whose
+            # setter has to be called.
+            def view(request, *args, **kwargs):
+                self = cls.__new__(cls)
+                self.__dict__.update(initkwargs)
+                return _dispatch(self, request, args, kwargs)
+        else:
+            def view(request, *args, **kwargs):
+                self = cls(*initargs, **initkwargs)
+                return _dispatch(self, request, args, kwargs)
+        # Let tools such as ``testing.assert_query_budgets`` find the view.
+        view.view_class = cls
+        view.view_initkwargs = initkwargs
         return view
     
+    @classmethod
+    def _get_handlers(cls):
+        """
+        Returns a ``(handlers, allowed_methods)`` tuple for this class, where
+        ``handlers`` maps each HTTP method name to its handler and
+        ``allowed_methods`` is the list sent in the ``Allow`` header of a 405.
+        
+        The table is built on first use and cached on the class itself (not
+        inherited by subclasses, which may define different handlers).
+        """
+        table = cls.__dict__.get('_handler_table')
+        if table is None:
+            handlers = {}
+            for method in cls.method_names:
+                handler = getattr(cls, method, None)
+                if handler is not None:
+                    handlers[method] = handler
+            allowed_methods = [m for m in cls.method_names if m in handlers]
+            table = (handlers, allowed_methods)
+            cls._handler_table = table
+        return table
+    
     def dispatch(self, request, *args, **kwargs):
         # Try to dispatch to the right method for that; if it doesn't exist,
         # raise a big error.
-        if hasattr(self, request.method.upper()):
+        handlers, allowed_methods = self._get_handlers()
+        handler = handlers.get(request.method.upper())
+        if handler is not None:
             self.request = request
             self.args = args
             self.kwargs = kwargs
             if request.method == "PUT":
                 coerce_put_post(request)
-            return getattr(self, request.method.upper())(request, *args, **kwargs)
+            return handler(self, request, *args, **kwargs)
         else:
-            allowed_methods = [m for m in self.method_names if hasattr(self, m)]
             return http.HttpResponseNotAllowed(allowed_methods)
     
+    def check_query_budget(self, queries):
+        """
+        Called in debug mode with the SQL of each query run while dispatching
+        a request, if the view has a ``max_queries`` budget. If there were
+        more queries than that, raises ``QueryBudgetExceeded`` or, if
+        ``query_budget_action`` is ``'log'``, logs a warning.
+        
+        Queries run while rendering a streamed response come after dispatch
+        and aren't counted.
+        """
+        if len(queries) <= self.max_queries:
+            return
+        message = u"%s ran %d queries, over its budget of %d:\n%s" % (
+            self.__class__.__name__, len(queries), self.max_queries,
+            u'\n'.join(queries))
+        if self.query_budget_action == 'log':
+            logging.getLogger('class_based_views').warning(message)
+        else:
+            raise QueryBudgetExceeded(message)
+    
+
+def _is_data_descriptor(cls, name):
+    """
+    Helper: returns ``True`` if the class attribute ``name`` has a setter,
+    such as a property, so that setting it on an instance calls code.
+    """
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            return hasattr(klass.__dict__[name], '__set__')
+    return False
+
+def _dispatch(view, request, args, kwargs):
+    """
+    Helper: dispatch a request to a view instance, instrumenting it and
+    checking its query budget if those are turned on.
+    """
+    budgeted = view.max_queries is not None and settings.DEBUG
+    if budgeted:
+        databases = connections.all()
+        before = [len(connection.queries) for connection in databases]
+    if view.instrumentation_sinks:
+        response = dispatch_instrumented(view, request, *args, **kwargs)
+    else:
+        response = view.dispatch(request, *args, **kwargs)
+    if budgeted:
+        queries = []
+        for connection, count in zip(databases, before):
+            queries.extend([query['sql'] for query in connection.queries[count:]])
+        view.check_query_budget(queries)
+    return response
 
 class TemplateView(View):
     """
     A view which can render itself with a template.
     """
     template_name = None
+    cache_templates = None
+    stream = False
+    stream_chunk_size = 8192
+    parallel_context = False
+    context_threads = 4
+    context_providers = ()
+    lazy_context = ()
     
     def render_to_response(self, template_names=None, context=None):
         """
         Returns a response with a template rendered with the given context.
+        
+        If ``get_stream()`` is true, the response content is an iterator that
+        renders the template as the response is sent to the client. Django
+        closes the database connections when the request finishes, which for
+        a streamed response is before the body is rendered, so the iterator
+        closes any connections opened while rendering once the server has
+        sent the response and closes it.
         """
+        if self.get_stream():
+            return self.get_response(_StreamingContent(self.render_iter(template_names, context)))
         return self.get_response(self.render(template_names, context))
     
     def get_response(self, content, **httpresponse_kwargs):
@@ -84,6 +259,36 @@ class TemplateView(View):
         context_instance = self.get_context_instance(context)
         return self.get_template(template_names).render(context_instance)
     
+    def render_iter(self, template_names=None, context=None):
+        """
+        Render the template with a given context, yielding the output in
+        chunks of roughly ``stream_chunk_size`` characters.
+        
+        ``{% for %}`` loops are rendered one item at a time, so a loop over a
+        lazy iterable (see ``ListView``) never holds more than one item in
+        memory. The loop length isn't known up front in that case, so
+        ``forloop.revcounter`` and ``forloop.revcounter0`` are not available.
+        Only loops at the top level of the template or of its blocks are
+        streamed; a loop inside another tag, such as ``{% if %}`` or
+        ``{% with %}``, is rendered in one go by that tag.
+        """
+        context_instance = self.get_context_instance(context)
+        template = self.get_template(template_names)
+        chunk_size = self.stream_chunk_size
+        context_instance.render_context.push()
+        try:
+            bits, size = [], 0
+            for bit in _render_nodelist_iter(template.nodelist, context_instance):
+                bits.append(bit)
+                size += len(bit)
+                if size >= chunk_size:
+                    yield u''.join(bits)
+                    bits, size = [], 0
+            if bits:
+                yield u''.join(bits)
+        finally:
+            context_instance.render_context.pop()
+    
     def get_context_instance(self, context=None):
         """
         Get the template context instance. Must return a Context (or subclass) 
@@ -119,6 +324,465 @@ class TemplateView(View):
     def load_template(self, names):
         """
         Load a list of templates using the default template loader.
+        
+        If ``get_cache_templates()`` is true the selected template is kept in a
+        process-wide cache, along with the parents it names in a constant
+        ``{% extends %}``, so later requests for the same list of names don't
+        go back to the template loaders. Parents named by a variable and
+        templates pulled in by ``{% include %}`` with a variable are still
+        loaded on every render; use Django's
+        ``django.template.loaders.cached.Loader`` to cache those as well.
+        """
+        if not self.get_cache_templates():
+            return loader.select_template(names)
+        key = tuple(names)
+        try:
+            return _template_cache[key]
+        except KeyError:
+            template = loader.select_template(names)
+            _load_parents(template)
+            _template_cache[key] = template
+            return template
+    
+    def get_stream(self):
+        """
+        Returns ``True`` if the response should be rendered as it is sent
+        rather than all at once.
+        """
+        return self.stream
+    
+    def get_cache_templates(self):
+        """
+        Returns ``True`` if compiled templates should be cached between
+        requests. Defaults to caching unless ``TEMPLATE_DEBUG`` is on, so that
+        template changes show up straight away during development.
+        """
+        if self.cache_templates is None:
+            return not settings.TEMPLATE_DEBUG
+        return self.cache_templates
+    
+    def get_parallel_context(self):
         """
-        return loader.select_template(names)
+        Returns ``True`` if independent context providers should be resolved
+        concurrently. See ``resolve_context()``.
+        """
+        return self.parallel_context
+    
+    def get_context_threads(self):
+        """
+        Returns the number of worker threads to resolve context providers in
+        when ``get_parallel_context()`` is true. Views asking for the same
+        number share one pool, so it should be large enough for the providers
+        of every request the process serves at once; requests beyond that
+        wait for a free thread.
+        """
+        return self.context_threads
+    
+    def get_context_providers(self, **kwargs):
+        """
+        Get the independent pieces of context declared in
+        ``context_providers``, as a dictionary mapping each name to a callable
+        taking no arguments, for ``resolve_context()``. The callable for
+        ``name`` calls the view's ``provide_<name>()`` method with ``kwargs``.
+        """
+        providers = {}
+        for name in self.context_providers:
+            providers[name] = _curry(getattr(self, 'provide_%s' % name), kwargs)
+        return providers
     
+    def resolve_context(self, providers):
+        """
+        Call each of the context providers in ``providers``, a dictionary
+        mapping names to callables taking no arguments, and return a
+        dictionary of their results. Providers must not depend on each other.
+        
+        If ``get_parallel_context()`` is true the providers are called at the
+        same time, one in this thread and the rest in a shared pool of
+        ``get_context_threads()`` worker threads, so slow queries take as long
+        as the slowest of them rather than the sum. Worker threads keep their
+        own database connections between requests, so they can't see changes
+        this request hasn't committed. Queries they run are added to this
+        thread's ``connection.queries``, so they count towards query budgets
+        and instrumentation. The first exception raised by a provider is
+        re-raised here.
+        Providers are always called one after another if any database is an
+        in-memory SQLite database, which other threads can't see.
+        
+        Otherwise, providers named in ``lazy_context`` aren't called until
+        their result is first looked up in the ``utils.LazyDict`` returned.
+        """
+        items = providers.items()
+        if (not self.get_parallel_context() or len(items) < 2
+                or getattr(_pool_state, 'in_pool', False) or _has_memory_database()):
+            results = LazyDict()
+            for name, provider in items:
+                if name in self.lazy_context:
+                    results.set_lazy(name, provider)
+                else:
+                    results[name] = provider()
+            return results
+        
+        names = [name for name, provider in items]
+        pool = _get_context_pool(self.get_context_threads())
+        outcomes = pool.map([provider for name, provider in items])
+        results = LazyDict()
+        for name, (result, exc_info) in zip(names, outcomes):
+            if exc_info is not None:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            results[name] = result
+        return results
+    
+
+def _curry(func, kwargs):
+    """
+    Helper: a callable taking no arguments that calls ``func(**kwargs)``.
+    """
+    return lambda: func(**kwargs)
+
+def _has_memory_database():
+    """
+    Helper: returns ``True`` if any database is an in-memory SQLite database.
+    """
+    for connection in connections.all():
+        settings_dict = connection.settings_dict
+        if 'sqlite3' in settings_dict['ENGINE'] and settings_dict['NAME'] == ':memory:':
+            return True
+    return False
+
+class _ContextPool(object):
+    """
+    Helper: a fixed number of daemon threads, started on first use, that call
+    context providers for ``TemplateView.resolve_context()``.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.jobs = Queue.Queue()
+        self.threads = []
+        self.lock = threading.Lock()
+    
+    def map(self, funcs):
+        """
+        Call each of ``funcs``, the first in this thread and the rest in the
+        pool, and return a list of ``(result, exc_info)`` pairs in the same
+        order, where ``exc_info`` is ``None`` unless the call raised.
+        """
+        self._start()
+        done = Queue.Queue()
+        for index, func in enumerate(funcs[1:]):
+            self.jobs.put((index + 1, func, done))
+        outcomes = [_call(funcs[0])] + [None] * (len(funcs) - 1)
+        for i in range(len(funcs) - 1):
+            index, outcome, queries = done.get()
+            outcomes[index] = outcome
+            for alias, logged in queries:
+                connections[alias].queries.extend(logged)
+        return outcomes
+    
+    def _start(self):
+        self.lock.acquire()
+        try:
+            while len(self.threads) < self.size:
+                thread = threading.Thread(target=self._work)
+                thread.setDaemon(True)
+                thread.start()
+                self.threads.append(thread)
+        finally:
+            self.lock.release()
+    
+    def _work(self):
+        _pool_state.in_pool = True
+        while True:
+            index, func, done = self.jobs.get()
+            outcome = _call(func)
+            # Hand the queries this job ran to the thread that's waiting for
+            # it, rather than letting them pile up here.
+            queries = []
+            for alias in connections:
+                connection = connections[alias]
+                if connection.queries:
+                    queries.append((alias, connection.queries))
+                    connection.queries = []
+            done.put((index, outcome, queries))
+            # Don't leave a transaction open on this thread's connections
+            # until its next job.
+            for alias in connections:
+                try:
+                    transaction.rollback_unless_managed(using=alias)
+                except Exception:
+                    connections[alias].close()
+    
+
+def _call(func):
+    """
+    Helper: call ``func`` and return ``(result, None)``, or
+    ``(None, exc_info)`` if it raised.
+    """
+    try:
+        return func(), None
+    except Exception:
+        return None, sys.exc_info()
+
+def _get_context_pool(size):
+    """
+    Helper: the shared pool of ``size`` worker threads.
+    """
+    _context_pools_lock.acquire()
+    try:
+        if size not in _context_pools:
+            _context_pools[size] = _ContextPool(size)
+        return _context_pools[size]
+    finally:
+        _context_pools_lock.release()
+
+# Worker threads for TemplateView.resolve_context() by pool size, and whether
+# the current thread is one of them; providers that resolve context themselves
+# do so in their own thread rather than waiting on a pool.
+_context_pools = {}
+_context_pools_lock = threading.Lock()
+_pool_state = threading.local()
+
+class ResponseCacheMixin(object):
+    """
+    A mixin for ``TemplateView`` subclasses that caches the rendered response
+    to GET and HEAD requests. On a cache hit the view's handler isn't called
+    at all, so no queries are run and nothing is rendered.
+    
+    The cache key is made from the request path, ``self.kwargs``, the values
+    of the ``GET`` parameters named in ``cache_key_params``, whether the
+    request asks for JSON (for views with ``json_fields``) and
+    ``cache_version``; bump the version to invalidate every cached response
+    of a view. Only 200 responses are cached, with their headers, and a hit
+    is checked against the request's ``If-None-Match`` and
+    ``If-Modified-Since`` as the view itself would.
+    
+    Nothing about the user is part of the key, so every user gets the
+    response rendered for whoever asked first. Don't use this for pages that
+    show anything per-user from the ``RequestContext``, such as the logged in
+    user or their messages, unless ``get_cache_key()`` is extended to
+    include it.
+    """
+    cache_timeout = None
+    cache_key_params = ()
+    cache_version = None
+    
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super(ResponseCacheMixin, self).dispatch(request, *args, **kwargs)
+        self.request = request
+        self.args = args
+        self.kwargs = kwargs
+        key = self.get_cache_key()
+        if key is None:
+            return super(ResponseCacheMixin, self).dispatch(request, *args, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.get_cached_response(*cached)
+        response = super(ResponseCacheMixin, self).dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not self.get_stream():
+            cache.set(key, (response.content, response.items()), self.get_cache_timeout())
+        return response
+    
+    def get_cached_response(self, content, headers):
+        """
+        Rebuild a response from the cached content and headers, or return a
+        304 if the request's validators match them.
+        """
+        headers = dict(headers)
+        etag = headers.get('ETag')
+        if etag is not None:
+            etag = parse_etags(etag)[0]
+        last_modified = headers.get('Last-Modified')
+        if last_modified is not None:
+            last_modified = parse_http_date_safe(last_modified)
+            if last_modified is not None:
+                last_modified = datetime.datetime.utcfromtimestamp(last_modified)
+        response = get_not_modified_response(self.request, etag, last_modified)
+        if response is None:
+            response = http.HttpResponse(content)
+        for name, value in headers.items():
+            if response.status_code == 304 and name == 'Content-Type':
+                continue
+            response[name] = value
+        return response
+    
+    def get_cache_key(self):
+        """
+        Returns the key to cache this request's response under, or ``None``
+        if it shouldn't be cached.
+        """
+        params = [(name, self.request.GET.getlist(name))
+                  for name in self.cache_key_params]
+        bits = [
+            self.__class__.__module__,
+            self.__class__.__name__,
+            self.cache_version,
+            self.request.path,
+            self.args,
+            sorted(self.kwargs.items()),
+            params,
+        ]
+        get_json_fields = getattr(self, 'get_json_fields', None)
+        if get_json_fields is not None and get_json_fields() is not None:
+            # Views that can answer with JSON cache it apart from the HTML.
+            bits.append(wants_json(self.request))
+        return 'class_based_views.response.%s' % md5_constructor(
+            smart_str(repr(bits))).hexdigest()
+    
+    def get_cache_timeout(self):
+        """
+        Get the number of seconds to cache responses for, or ``None`` for the
+        cache backend's default.
+        """
+        return self.cache_timeout
+    
+
+class _StreamingContent(object):
+    """
+    Helper: the content of a streamed response. WSGI servers call
+    ``close()`` once the response has been sent, which closes the database
+    connections the way ``request_finished`` would have, except for those in
+    a managed transaction.
+    """
+    def __init__(self, iterator):
+        self.iterator = iterator
+    
+    def __iter__(self):
+        return self.iterator
+    
+    def close(self):
+        self.iterator.close()
+        for alias in connections:
+            if not transaction.is_managed(using=alias):
+                connections[alias].close()
+    
+
+def _render_nodelist_iter(nodelist, context):
+    """
+    Helper: render a template ``NodeList`` as a sequence of strings. This
+    follows what ``Node.render()`` does for ``{% extends %}``, ``{% block %}``
+    and ``{% for %}``, but yields as it goes instead of building up the whole
+    output.
+    """
+    for node in nodelist:
+        if isinstance(node, ExtendsNode):
+            for bit in _render_extends_iter(node, context):
+                yield bit
+        elif isinstance(node, BlockNode):
+            for bit in _render_block_iter(node, context):
+                yield bit
+        elif isinstance(node, ForNode):
+            for bit in _render_for_iter(node, context):
+                yield bit
+        else:
+            yield force_unicode(nodelist.render_node(node, context))
+
+def _render_extends_iter(node, context):
+    """
+    Helper: streaming version of ``ExtendsNode.render()``.
+    """
+    compiled_parent = node.get_parent(context)
+    if BLOCK_CONTEXT_KEY not in context.render_context:
+        context.render_context[BLOCK_CONTEXT_KEY] = BlockContext()
+    block_context = context.render_context[BLOCK_CONTEXT_KEY]
+    block_context.add_blocks(node.blocks)
+    for parent_node in compiled_parent.nodelist:
+        if not isinstance(parent_node, TextNode):
+            if not isinstance(parent_node, ExtendsNode):
+                blocks = dict([(n.name, n) for n in
+                               compiled_parent.nodelist.get_nodes_by_type(BlockNode)])
+                block_context.add_blocks(blocks)
+            break
+    for bit in _render_nodelist_iter(compiled_parent.nodelist, context):
+        yield bit
+
+def _render_block_iter(node, context):
+    """
+    Helper: streaming version of ``BlockNode.render()``.
+    """
+    block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+    context.push()
+    if block_context is None:
+        context['block'] = node
+        for bit in _render_nodelist_iter(node.nodelist, context):
+            yield bit
+    else:
+        push = block = block_context.pop(node.name)
+        if block is None:
+            block = node
+        block = BlockNode(block.name, block.nodelist)
+        block.context = context
+        context['block'] = block
+        for bit in _render_nodelist_iter(block.nodelist, context):
+            yield bit
+        if push is not None:
+            block_context.push(node.name, push)
+    context.pop()
+
+def _render_for_iter(node, context):
+    """
+    Helper: streaming version of ``ForNode.render()``. Sequences without a
+    length are consumed lazily, looking one item ahead to set
+    ``forloop.last``.
+    """
+    if 'forloop' in context:
+        parentloop = context['forloop']
+    else:
+        parentloop = {}
+    context.push()
+    try:
+        values = node.sequence.resolve(context, True)
+    except VariableDoesNotExist:
+        values = []
+    if values is None:
+        values = []
+    if node.is_reversed:
+        values = list(values)
+        values.reverse()
+    if hasattr(values, '__len__'):
+        len_values = len(values)
+    else:
+        len_values = None
+    iterator = iter(values)
+    try:
+        item = iterator.next()
+    except StopIteration:
+        context.pop()
+        for bit in _render_nodelist_iter(node.nodelist_empty, context):
+            yield bit
+        return
+    unpack = len(node.loopvars) > 1
+    loop_dict = context['forloop'] = {'parentloop': parentloop}
+    i = 0
+    while True:
+        try:
+            next_item = iterator.next()
+            last = False
+        except StopIteration:
+            last = True
+        loop_dict['counter0'] = i
+        loop_dict['counter'] = i + 1
+        if len_values is not None:
+            loop_dict['revcounter'] = len_values - i
+            loop_dict['revcounter0'] = len_values - i - 1
+        loop_dict['first'] = (i == 0)
+        loop_dict['last'] = last
+        pop_context = False
+        if unpack:
+            try:
+                unpacked_vars = dict(zip(node.loopvars, item))
+            except TypeError:
+                pass
+            else:
+                pop_context = True
+                context.update(unpacked_vars)
+        else:
+            context[node.loopvars[0]] = item
+        for bit in _render_nodelist_iter(node.nodelist_loop, context):
+            yield bit
+        if pop_context:
+            context.pop()
+        if last:
+            break
+        item = next_item
+        i += 1
+    context.pop()
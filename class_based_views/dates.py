@@ -1,9 +1,17 @@
+import re
 import time
 import datetime
-from django.db import models
+import itertools
+import threading
+from django.core.cache import cache
+from django.db import connections, models, router
+from django.db.backends.util import typecast_timestamp
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.core.exceptions import ImproperlyConfigured
 from django.http import Http404
 from class_based_views import ListView, DetailView
+from class_based_views.utils import (LazyDict, get_not_modified_response, has_items,
+                                     set_validator_headers)
 
 class DateView(ListView):
     """
@@ -12,12 +20,24 @@ class DateView(ListView):
     
     allow_future = False
     date_field = None
+    last_modified_field = None
+    date_index = None
+    tzinfo = None
 
     def GET(self, request, *args, **kwargs):
         date_list, items, extra_context = self.get_dated_items(*args, **kwargs)
-        context = self.get_context(items, date_list)
-        context.update(extra_context)
-        return self.render_to_response(self.get_template_names(items), context)
+        # The validators cover everything the page is made from, including the
+        # date list, not just the items it shows.
+        queryset = getattr(self, 'dated_queryset', items)
+        etag, last_modified = self.get_etag(queryset), self.get_last_modified(queryset)
+        response = get_not_modified_response(request, etag, last_modified)
+        if response is None:
+            # Keep any lazy entries of extra_context pending.
+            context = LazyDict(self.get_context(items, date_list))
+            context.update(extra_context)
+            response = self.render_to_response(self.get_template_names(items), context)
+        set_validator_headers(response, etag, last_modified)
+        return response
 
     def get_queryset(self):
         """
@@ -29,7 +49,13 @@ class DateView(ListView):
                                        u"%(cls)s.queryset, or override "
                                        u"%(cls)s.get_dated_items()."
                                        % {'cls': self.__class__.__name__})
-        return self.queryset._clone()
+        queryset = self.queryset._clone()
+        select_related = self.get_select_related()
+        if select_related is True:
+            queryset = queryset.select_related()
+        elif select_related:
+            queryset = queryset.select_related(*select_related)
+        return queryset
 
     def get_dated_queryset(self, allow_future=False, **lookup):
         """
@@ -42,28 +68,51 @@ class DateView(ListView):
         allow_empty = self.get_allow_empty()
 
         if not allow_future:
-            qs = qs.filter(**{'%s__lte' % date_field: datetime.datetime.now()})
+            now = datetime.datetime.now(self.get_tzinfo())
+            qs = qs.filter(**{'%s__lte' % date_field: now})
 
-        if not allow_empty and not qs:
+        if not allow_empty and not has_items(qs):
             raise Http404(u"No %s available"
                           % qs.model._meta.verbose_name_plural)
+        self.dated_queryset = qs
         return qs
 
-    def get_date_list(self, queryset, date_type):
+    def get_date_list(self, queryset, date_type, date_range=None):
         """
         Get a date list by calling `queryset.dates()`, checking along the way
         for empty lists that aren't allowed.
+
+        If the view has a `date_index`, the list is read from that instead,
+        limited to `date_range` (a `(start, end)` tuple of dates, with `end`
+        excluded) if given. In that case the number of objects per date is
+        also put in the context as `date_counts`.
         """
         date_field = self.get_date_field()
         allow_empty = self.get_allow_empty()
 
-        date_list = queryset.dates(date_field, date_type)[::-1]
+        date_index = self.get_date_index()
+        if date_index is not None:
+            start, end = date_range or (None, None)
+            buckets = date_index.get_buckets(date_type, start, end,
+                                             allow_future=self.get_allow_future())
+            date_list = [date for date, count in buckets]
+            self.date_counts = dict(buckets)
+        else:
+            date_list = queryset.dates(date_field, date_type)[::-1]
         if date_list is not None and not date_list and not allow_empty:
             raise Http404(u"No %s available"
                           % queryset.model._meta.verbose_name_plural)
 
         return date_list
 
+    def get_date_index(self):
+        """
+        Get the `DateIndex` to read date lists from, or `None` to query for
+        them. The index covers every object of its model, so only use one
+        with views whose queryset isn't filtered.
+        """
+        return self.date_index
+
     def get_date_field(self):
         """
         Get the name of the date field to be used to filter by.
@@ -80,12 +129,50 @@ class DateView(ListView):
         """
         return self.allow_future
 
+    def get_tzinfo(self):
+        """
+        Get the time zone that dates in the URL are in, used to bound lookups
+        against a `DateTimeField`, or `None` for naive datetimes. The database
+        backend must accept timezone-aware datetimes if this is set.
+        """
+        return self.tzinfo
+
+    def get_date_range_lookup(self, start, end):
+        """
+        Get the lookup kwargs for objects dated from `start` up to but not
+        including `end`.
+        """
+        field = self.get_queryset().model._meta.get_field(self.get_date_field())
+        return _date_range_lookup(field, start, end, self.get_tzinfo())
+
+    def get_last_modified(self, queryset):
+        """
+        Get the datetime the objects the request covers were last modified,
+        for the `Last-Modified` header, or `None`. `queryset` is the one from
+        `get_dated_queryset()`, which the date list and the items are both
+        taken from. If `last_modified_field` is set this is the greatest value
+        of it in the queryset, found with a single aggregate query.
+        """
+        if self.last_modified_field is None or not hasattr(queryset, 'aggregate'):
+            return None
+        return queryset.aggregate(
+            last_modified=models.Max(self.last_modified_field))['last_modified']
+
+    def get_etag(self, queryset):
+        """
+        Get an ETag for the objects in the queryset from
+        `get_dated_queryset()`, or `None` to not send one.
+        """
+        return None
+
     def get_context(self, items, date_list, context=None):
         """
         Get the context. Must return a Context (or subclass) instance.
         """
         context = super(DateView, self).get_context(items)
         context['date_list'] = date_list
+        if hasattr(self, 'date_counts'):
+            context['date_counts'] = self.date_counts
         return context
 
     def get_template_names(self, items):
@@ -156,8 +243,12 @@ class YearView(DateView):
         # an error if it doesn't.
         year = int(year)
         date_field = self.get_date_field()
-        qs = self.get_dated_queryset(**{date_field+'__year': year})
-        date_list = self.get_date_list(qs, 'month')
+        first_day = datetime.date(year, 1, 1)
+        last_day = datetime.date(year + 1, 1, 1)
+        lookup_kwargs = self.get_date_range_lookup(first_day, last_day)
+
+        qs = self.get_dated_queryset(**lookup_kwargs)
+        date_list = self.get_date_list(qs, 'month', date_range=(first_day, last_day))
 
         if self.get_make_object_list():
             object_list = qs.order_by('-'+date_field)
@@ -182,47 +273,58 @@ class MonthView(DateView):
     
     month_format = '%b'
     allow_empty = False
+    context_providers = ('date_list',)
     _template_name_suffix = 'archive_month'
     
     def get_dated_items(self, year, month):
         """
         Return (date_list, items, extra_context) for this request.
         """
-        date_field = self.get_date_field()
         date = _date_from_string(year, '%Y', month, self.get_month_format())
 
         # Construct a date-range lookup.
         first_day, last_day = _month_bounds(date)
-        lookup_kwargs = {
-            '%s__gte' % date_field: first_day,
-            '%s__lt' % date_field: last_day,
-        }
+        lookup_kwargs = self.get_date_range_lookup(first_day, last_day)
 
         allow_future = self.get_allow_future()
         qs = self.get_dated_queryset(allow_future=allow_future, **lookup_kwargs)
-        date_list = self.get_date_list(qs, 'day')
 
-        return (date_list, qs, {
-            'month': date,
-            'next_month': self.get_next_month(date),
-            'previous_month': self.get_previous_month(date),
-        })
+        context = self.resolve_context(self.get_context_providers(
+            queryset=qs, date=date, date_range=(first_day, last_day)))
+        date_list = context.pop('date_list')
+        # The neighbouring months are only looked up if the template uses them.
+        context['month'] = date
+        context.set_lazy('next_month', lambda: self.get_next_month(date))
+        context.set_lazy('previous_month', lambda: self.get_previous_month(date))
+        return (date_list, qs, context)
+
+    def provide_date_list(self, queryset, date, date_range):
+        """
+        Get the days in the month that have objects.
+        """
+        return self.get_date_list(queryset, 'day', date_range=date_range)
 
     def get_next_month(self, date):
         """
         Get the next valid month.
         """
-        first_day, last_day = _month_bounds(date)
-        next = (last_day + datetime.timedelta(days=1)).replace(day=1)
-        return _get_next_prev_month(self, next, is_previous=False, use_first_day=True)
+        return self._get_next_prev_months(date)[0]
 
     def get_previous_month(self, date):
         """
         Get the previous valid month.
         """
+        return self._get_next_prev_months(date)[1]
+
+    def _get_next_prev_months(self, date):
+        """
+        Get the next and previous valid months together, since they can be
+        looked up with a single query.
+        """
         first_day, last_day = _month_bounds(date)
+        next = (last_day + datetime.timedelta(days=1)).replace(day=1)
         prev = (first_day - datetime.timedelta(days=1)).replace(day=1)
-        return _get_next_prev_month(self, prev, is_previous=True, use_first_day=True)
+        return _get_next_prev(self, next, prev, use_first_day=True)
 
     def get_month_format(self):
         """
@@ -243,16 +345,12 @@ class WeekView(DateView):
         """
         Return (date_list, items, extra_context) for this request.
         """
-        date_field = self.get_date_field()
         date = _date_from_string(year, '%Y', '0', '%w', week, '%U')
 
         # Construct a date-range lookup.
         first_day = date
         last_day = date + datetime.timedelta(days=7)
-        lookup_kwargs = {
-            '%s__gte' % date_field: first_day,
-            '%s__lt' % date_field: last_day,
-        }
+        lookup_kwargs = self.get_date_range_lookup(first_day, last_day)
 
         allow_future = self.get_allow_future()
         qs = self.get_dated_queryset(allow_future=allow_future, **lookup_kwargs)
@@ -284,33 +382,38 @@ class DayView(DateView):
         Do the actual heavy lifting of getting the dated items; this accepts a
         date object so that TodayView can be trivial.
         """
-        date_field = self.get_date_field()
         allow_future = self.get_allow_future()
-
-        field = self.get_queryset().model._meta.get_field(date_field)
-        lookup_kwargs = _date_lookup_for_field(field, date)
+        lookup_kwargs = self.get_date_range_lookup(
+            date, date + datetime.timedelta(days=1))
 
         qs = self.get_dated_queryset(allow_future=allow_future, **lookup_kwargs)
 
-        return (None, qs, {
-            'day': date,
-            'previous_day': self.get_previous_day(date),
-            'next_day': self.get_next_day(date)
-        })
+        # The neighbouring days are only looked up if the template uses them.
+        context = LazyDict(day=date)
+        context.set_lazy('previous_day', lambda: self.get_previous_day(date))
+        context.set_lazy('next_day', lambda: self.get_next_day(date))
+        return (None, qs, context)
 
     def get_next_day(self, date):
         """
         Get the next valid day.
         """
-        next = date + datetime.timedelta(days=1)
-        return _get_next_prev_month(self, next, is_previous=False, use_first_day=False)
+        return self._get_next_prev_days(date)[0]
 
     def get_previous_day(self, date):
         """
         Get the previous valid day.
         """
+        return self._get_next_prev_days(date)[1]
+
+    def _get_next_prev_days(self, date):
+        """
+        Get the next and previous valid days together, since they can be
+        looked up with a single query.
+        """
+        next = date + datetime.timedelta(days=1)
         prev = date - datetime.timedelta(days=1)
-        return _get_next_prev_month(self, prev, is_previous=True, use_first_day=False)
+        return _get_next_prev(self, next, prev, use_first_day=False)
 
     def get_month_format(self):
         """
@@ -348,6 +451,7 @@ class DateDetailView(DetailView):
     month_format = '%b'
     day_format = '%d'
     allow_future = False
+    tzinfo = None
     
     def get_object(self, year, month, day, pk=None, slug=None):
         """
@@ -369,7 +473,8 @@ class DateDetailView(DetailView):
         # which'll handle the 404
         date_field = self.get_date_field()
         field = qs.model._meta.get_field(date_field)
-        lookup = _date_lookup_for_field(field, date)
+        lookup = _date_range_lookup(field, date, date + datetime.timedelta(days=1),
+                                    self.get_tzinfo())
         qs = qs.filter(**lookup)
 
         return super(DateDetailView, self).get_object(pk=pk, slug=slug, queryset=qs)
@@ -404,18 +509,275 @@ class DateDetailView(DetailView):
         """
         return self.allow_future
 
+    def get_tzinfo(self):
+        """
+        Get the time zone that dates in the URL are in, used to bound lookups
+        against a `DateTimeField`, or `None` for naive datetimes.
+        """
+        return self.tzinfo
+
+class DateIndex(object):
+    """
+    A histogram of the number of objects of a model per day of one of its
+    date fields, kept in the cache so that date-based views don't have to run
+    a `SELECT DISTINCT` over the whole table to list the available dates.
+
+    The index is built with a single `GROUP BY` query the first time it's
+    needed (and again whenever it drops out of the cache after `timeout`
+    seconds), and kept up to date in between as objects are saved and
+    deleted. Updates from different processes aren't atomic, so the counts
+    can drift slightly under concurrent writes until the next rebuild.
+    Saving an existing object costs one extra query to read the date it had
+    before; creating one doesn't.
+
+    Create one per (model, date field) when your models are loaded, and set
+    it as the `date_index` of the views::
+
+        book_dates = DateIndex(Book, 'pubdate')
+
+        class BookArchive(ArchiveView):
+            queryset = Book.objects.all()
+            date_field = 'pubdate'
+            date_index = book_dates
+    """
+
+    def __init__(self, model, date_field, timeout=None):
+        self.model = model
+        self.field = model._meta.get_field(date_field)
+        self.timeout = timeout
+        opts = model._meta
+        self.cache_key = 'class_based_views.dateindex.%s.%s.%s' % (
+            opts.app_label, opts.object_name.lower(), date_field)
+        uid = self.cache_key
+        pre_save.connect(self._pre_save, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(self._post_save, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(self._post_delete, sender=model, weak=False, dispatch_uid=uid)
+
+    def get_buckets(self, date_type, start=None, end=None, allow_future=False):
+        """
+        Return a list of `(datetime, count)` tuples for every year, month or
+        day (according to `date_type`) that has objects, latest first, like
+        `QuerySet.dates()` reversed. Only days from `start` up to but not
+        including `end` are counted.
+        """
+        today = datetime.date.today()
+        buckets = {}
+        for day, count in self.get_counts().iteritems():
+            if (not count or (start is not None and day < start) or
+                    (end is not None and day >= end) or
+                    (not allow_future and day > today)):
+                continue
+            if date_type == 'year':
+                key = datetime.datetime(day.year, 1, 1)
+            elif date_type == 'month':
+                key = datetime.datetime(day.year, day.month, 1)
+            else:
+                key = datetime.datetime(day.year, day.month, day.day)
+            buckets[key] = buckets.get(key, 0) + count
+        return sorted(buckets.items(), reverse=True)
+
+    def get_counts(self):
+        """
+        Return the raw `{date: count}` histogram, building it if needed.
+        """
+        counts = cache.get(self.cache_key)
+        if counts is None:
+            counts = self.rebuild()
+        return counts
+
+    def rebuild(self):
+        """
+        Count the objects per day from scratch and store the result.
+        """
+        using = router.db_for_read(self.model)
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        day = connection.ops.date_trunc_sql('day', '%s.%s' % (
+            qn(self.model._meta.db_table), qn(self.field.column)))
+        cursor = connection.cursor()
+        cursor.execute('SELECT %s, COUNT(*) FROM %s WHERE %s IS NOT NULL GROUP BY %s' % (
+            day, qn(self.model._meta.db_table), qn(self.field.column), day))
+        counts = {}
+        for value, count in cursor.fetchall():
+            counts[_to_date(value)] = count
+        cache.set(self.cache_key, counts, self.timeout)
+        return counts
+
+    def _add(self, day, delta):
+        counts = cache.get(self.cache_key)
+        if counts is None:
+            # Nothing to update; the next read rebuilds from the database.
+            return
+        counts[day] = counts.get(day, 0) + delta
+        if counts[day] <= 0:
+            del counts[day]
+        cache.set(self.cache_key, counts, self.timeout)
+
+    def _pre_save(self, sender, instance, **kwargs):
+        # Remember the stored date so a change can be moved between buckets.
+        # New objects have nothing stored yet and a missing index is rebuilt
+        # from scratch anyway, so only updates of an object while the index
+        # is cached pay for the extra SELECT.
+        old = None
+        if instance.pk is not None and cache.get(self.cache_key) is not None:
+            try:
+                old = sender._default_manager.filter(pk=instance.pk).values_list(
+                    self.field.attname, flat=True)[0]
+            except IndexError:
+                pass
+        instance._date_index_old = getattr(instance, '_date_index_old', {})
+        instance._date_index_old[self.cache_key] = old
+
+    def _post_save(self, sender, instance, **kwargs):
+        old = getattr(instance, '_date_index_old', {}).pop(self.cache_key, None)
+        new = getattr(instance, self.field.attname)
+        if old is not None:
+            old = _to_date(old)
+        if new is not None:
+            new = _to_date(new)
+        if old == new:
+            return
+        if old is not None:
+            self._add(old, -1)
+        if new is not None:
+            self._add(new, 1)
+
+    def _post_delete(self, sender, instance, **kwargs):
+        value = getattr(instance, self.field.attname)
+        if value is not None:
+            self._add(_to_date(value), -1)
+
+def _to_date(value):
+    """
+    Helper: convert a date, datetime or a database timestamp string to a date.
+    """
+    if isinstance(value, basestring):
+        value = typecast_timestamp(value)
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value
+
+# Parsed dates, keyed by (date string, formats, delimiter), holding the date
+# and a tick recording when it was last used.
+_DATE_CACHE_SIZE = 1000
+_date_cache = {}
+_date_cache_lock = threading.Lock()
+_date_cache_ticks = itertools.count()
+
+# Compiled parsers, keyed by (formats, delimiter).
+_date_parsers = {}
+
+# The strptime patterns for the numeric directives the compiled parsers handle.
+_DATE_DIRECTIVES = {
+    '%Y': ('year', r'\d\d\d\d'),
+    '%m': ('month', r'1[0-2]|0[1-9]|[1-9]'),
+    '%d': ('day', r'3[01]|[12]\d|0[1-9]|[1-9]| [1-9]'),
+}
+
 def _date_from_string(year, year_format, month, month_format, day='', day_format='', delim='__'):
     """
     Helper: get a datetime.date object given a format string and a year,
     month, and possibly day; raise a 404 for an invalid date.
     """
-    format = delim.join((year_format, month_format, day_format))
+    formats = (year_format, month_format, day_format)
     datestr = delim.join((year, month, day))
+    key = (datestr, formats, delim)
     try:
-        return datetime.date(*time.strptime(datestr, format)[:3])
+        entry = _date_cache[key]
+    except KeyError:
+        pass
+    else:
+        entry[1] = _date_cache_ticks.next()
+        return entry[0]
+
+    try:
+        date = datetime.date(*_get_date_parser(formats, delim)(datestr))
     except ValueError:
         raise Http404(u"Invalid date string '%s' given format '%s'" 
-                      % (datestr, format))
+                      % (datestr, delim.join(formats)))
+
+    if len(_date_cache) >= _DATE_CACHE_SIZE:
+        _prune_date_cache()
+    _date_cache[key] = [date, _date_cache_ticks.next()]
+    return date
+
+def _prune_date_cache():
+    """
+    Helper: drop the least recently used half of the parsed date cache.
+    """
+    _date_cache_lock.acquire()
+    try:
+        if len(_date_cache) < _DATE_CACHE_SIZE:
+            return
+        entries = sorted(_date_cache.items(), key=lambda item: item[1][1])
+        for key, entry in entries[:len(entries) // 2]:
+            _date_cache.pop(key, None)
+    finally:
+        _date_cache_lock.release()
+
+def _get_date_parser(formats, delim):
+    """
+    Helper: get the parser for dates joined by `delim` in the given formats.
+    """
+    key = (formats, delim)
+    try:
+        return _date_parsers[key]
+    except KeyError:
+        parser = _date_parsers[key] = _compile_date_parser(formats, delim)
+        return parser
+
+def _compile_date_parser(formats, delim):
+    """
+    Helper: build a function which parses a date string into a (year, month,
+    day) tuple, raising ValueError if it doesn't match.
+
+    Year, numeric month and day and month name formats are matched with a
+    single precompiled regular expression accepting exactly what
+    `time.strptime` would; anything else falls back to `time.strptime`.
+    """
+    format = delim.join(formats)
+    def parse_with_strptime(datestr):
+        return time.strptime(datestr, format)[:3]
+
+    month_names = {}
+    fields = set()
+    patterns = []
+    for part in formats:
+        if not part:
+            patterns.append('')
+            continue
+        if part in ('%b', '%B'):
+            field = 'month'
+            for number in range(1, 13):
+                month_name = time.strftime(part, (2000, number, 1, 0, 0, 0, 0, 1, -1))
+                try:
+                    month_names[month_name.decode('ascii').lower()] = number
+                except UnicodeDecodeError:
+                    return parse_with_strptime
+            pattern = '|'.join([re.escape(name) for name in
+                                sorted(month_names, key=len, reverse=True)])
+        elif part in _DATE_DIRECTIVES:
+            field, pattern = _DATE_DIRECTIVES[part]
+        else:
+            return parse_with_strptime
+        if field in fields:
+            return parse_with_strptime
+        fields.add(field)
+        patterns.append('(?P<%s>%s)' % (field, pattern))
+    # \Z rather than $, which would also match before a trailing newline.
+    regex = re.compile(r'^%s\Z' % re.escape(delim).join(patterns), re.IGNORECASE)
+
+    def parse(datestr):
+        match = regex.match(datestr)
+        if match is None:
+            raise ValueError("time data %r does not match format %r" % (datestr, format))
+        values = match.groupdict()
+        year = int(values.get('year') or 1900)
+        month = values.get('month') or 1
+        if month_names:
+            month = month_names[month.lower()]
+        return year, int(month), int(values.get('day') or 1)
+    return parse
 
 def _month_bounds(date):
     """
@@ -429,14 +791,14 @@ def _month_bounds(date):
 
     return first_day, last_day
 
-def _get_next_prev_month(generic_view, naive_result, is_previous, use_first_day):
+def _get_next_prev(generic_view, naive_next, naive_prev, use_first_day):
     """
-    Helper: Get the next or the previous valid date. The idea is to allow
-    links on month/day views to never be 404s by never providing a date
-    that'll be invalid for the given view.
+    Helper: Get the next and the previous valid dates, as a (next, previous)
+    tuple. The idea is to allow links on month/day views to never be 404s by
+    never providing a date that'll be invalid for the given view.
 
-    This is a bit complicated since it handles both next and previous months
-    and days (for MonthView and DayView); hence the coupling to generic_view.
+    This is a bit complicated since it handles both months and days (for
+    MonthView and DayView); hence the coupling to generic_view.
 
     However in essance the logic comes down to:
 
@@ -455,37 +817,65 @@ def _get_next_prev_month(generic_view, naive_result, is_previous, use_first_day)
           date that contains a valid object. If that date is in the future, or
           if there are no next objects, return None.
 
+    Both dates are worked out together, so that this is at most one query.
+    The result is remembered on the view, since the next and previous dates
+    are usually asked for one after the other.
     """
-    date_field = generic_view.get_date_field()
+    memo = generic_view.__dict__.setdefault('_next_prev_dates', {})
+    key = (naive_next, naive_prev, use_first_day)
+    if key in memo:
+        return memo[key]
+
     allow_empty = generic_view.get_allow_empty()
     allow_future = generic_view.get_allow_future()
 
-    # If allow_empty is True the naive value will be valid
+    # If allow_empty is True the naive values will be valid
     if allow_empty:
-        result = naive_result
+        next, prev = naive_next, naive_prev
 
-    # Otherwise, we'll need to go to the database to look for an object
-    # whose date_field is at least (greater than/less than) the given
-    # naive result
+    # Otherwise, we'll need to go to the database to look for the objects
+    # whose date_field is nearest to (at least/at most) the naive results.
     else:
-        # Construct a lookup and an ordering depending on weather we're doing
-        # a previous date or a next date lookup.
-        if is_previous:
-            lookup = {'%s__lte' % date_field: naive_result}
-            ordering = '-%s' % date_field
-        else:
-            lookup = {'%s__gte' % date_field: naive_result}
-            ordering = date_field
-
-        qs = generic_view.get_queryset().filter(**lookup).order_by(ordering)
+        next, prev = _get_nearest_dates(generic_view, naive_next, naive_prev)
 
-        # Snag the first object from the queryset; if it doesn't exist that
-        # means there's no next/previous link available.
-        try:
-            result = getattr(qs[0], date_field)
-        except IndexError:
-            result = None
+    result = memo[key] = (
+        _clean_next_prev(next, use_first_day, allow_future),
+        _clean_next_prev(prev, use_first_day, allow_future),
+    )
+    return result
 
+def _get_nearest_dates(generic_view, next, prev):
+    """
+    Helper: get the earliest date on or after `next` and the latest date on
+    or before `prev` that have objects, or None where there isn't one. Both
+    are fetched in one round trip by running the two ordered lookups as
+    scalar subqueries of a single SELECT.
+    """
+    date_field = generic_view.get_date_field()
+    qs = generic_view.get_queryset()
+    field = qs.model._meta.get_field(date_field)
+
+    next_qs = qs.filter(**{'%s__gte' % date_field: next}).order_by(date_field)
+    prev_qs = qs.filter(**{'%s__lte' % date_field: prev}).order_by('-%s' % date_field)
+    next_sql, next_params = next_qs.values_list(date_field)[:1].query.get_compiler(qs.db).as_sql()
+    prev_sql, prev_params = prev_qs.values_list(date_field)[:1].query.get_compiler(qs.db).as_sql()
+
+    cursor = connections[qs.db].cursor()
+    cursor.execute('SELECT (%s), (%s)' % (next_sql, prev_sql),
+                   tuple(next_params) + tuple(prev_params))
+    next, prev = cursor.fetchone()
+
+    # Some backends hand back strings from a subquery, so convert.
+    return (
+        next is not None and field.to_python(next) or None,
+        prev is not None and field.to_python(prev) or None,
+    )
+
+def _clean_next_prev(result, use_first_day, allow_future):
+    """
+    Helper: Turn a next/previous date found by _get_next_prev into the value
+    given to templates.
+    """
     # Convert datetimes to a dates
     if hasattr(result, 'date'):
         result = result.date()
@@ -501,19 +891,32 @@ def _get_next_prev_month(generic_view, naive_result, is_previous, use_first_day)
     else:
         return None
 
-def _date_lookup_for_field(field, date):
+def _date_range_lookup(field, start, end, tzinfo=None):
     """
-    Get the lookup kwargs for looking up a date against a given Field. If the
-    date field is a DateTimeField, we can't just do filter(df=date) because
-    that doesn't take the time into account. So we need to make a range lookup
-    in those cases.
+    Get the lookup kwargs for objects whose date `field` falls on or after
+    the date `start` and before the date `end`. Lookups are always a
+    half-open `__gte`/`__lt` pair on the bare column, never `__year` or
+    `__range` up to `time.max`, so that the database can use an index on the
+    field.
+
+    For a DateTimeField the bounds are midnight at the start of each date,
+    in the time zone `tzinfo` if one is given.
     """
-    if isinstance(field, models.DateTimeField):
-        date_range = (
-            datetime.datetime.combine(date, datetime.time.min),
-            datetime.datetime.combine(date, datetime.time.max)
-        )
-        return {'%s__range' % field.name: date_range}
-    else:
-        return {field.name: date}
+    return {
+        '%s__gte' % field.name: _date_bound(field, start, tzinfo),
+        '%s__lt' % field.name: _date_bound(field, end, tzinfo),
+    }
 
+def _date_bound(field, date, tzinfo=None):
+    """
+    Helper: convert a date to a value to compare a date `field` against.
+    """
+    if not isinstance(field, models.DateTimeField):
+        return date
+    value = datetime.datetime.combine(date, datetime.time.min)
+    if tzinfo is None:
+        return value
+    if hasattr(tzinfo, 'localize'):
+        # pytz time zones need to pick the right UTC offset for the date.
+        return tzinfo.localize(value)
+    return value.replace(tzinfo=tzinfo)
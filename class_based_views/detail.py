@@ -1,8 +1,71 @@
 from class_based_views import TemplateView
-from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from class_based_views.utils import (get_json_row, get_not_modified_response, json_response,
+                                     prefetch_related_objects, set_validator_headers, wants_json)
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist, ValidationError
+from django.db.models.signals import post_delete, post_save
 from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import smart_str
+from django.utils.hashcompat import md5_constructor
+import random
 import re
 
+def invalidate_cached_object(obj):
+    """
+    Make the cached copies of the model instance ``obj`` stale: the object
+    itself, if ``SingleObjectMixin`` cached it, and every fragment
+    ``DetailView`` rendered for it. Both are fetched or rendered again on the
+    next request.
+    """
+    cache.set(_generation_key(obj._meta, obj.pk), _new_generation())
+
+def _generation_key(opts, pk):
+    """
+    Helper: the cache key of the token that changes whenever the cached
+    copies of the object with primary key ``pk`` are invalidated.
+    """
+    return 'class_based_views.generation.%s.%s' % (opts, pk)
+
+def _new_generation():
+    return '%x' % random.getrandbits(64)
+
+def _get_generation(opts, pk):
+    """
+    Helper: get the current token for the object, creating one if needed.
+    """
+    key = _generation_key(opts, pk)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation())
+        generation = cache.get(key)
+    return generation
+
+# Models whose instances are invalidated as they are saved and deleted.
+_invalidated_models = set()
+
+def invalidate_on_change(model):
+    """
+    Invalidate the cached copies of instances of ``model`` whenever one is
+    saved or deleted.
+    
+    Views with ``cache_objects`` or ``cache_fragments`` call this for the
+    model of their ``queryset`` when they are created with ``as_view()``, so
+    any process that loads the URLconf keeps the cache up to date. Processes
+    that change objects without loading the URLconf, such as management
+    commands, and views that don't set ``queryset`` need this to be called
+    when the models are loaded, for example at the bottom of ``models.py``.
+    """
+    if model in _invalidated_models:
+        return
+    uid = 'class_based_views.detail.%s' % model._meta
+    post_save.connect(_invalidate_instance, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(_invalidate_instance, sender=model, weak=False, dispatch_uid=uid)
+    _invalidated_models.add(model)
+
+def _invalidate_instance(sender, instance, **kwargs):
+    invalidate_cached_object(instance)
+
 class SingleObjectMixin(object):
     """
     Provides a get_object() method.
@@ -10,6 +73,27 @@ class SingleObjectMixin(object):
     
     queryset = None
     slug_field = 'slug'
+    last_modified_field = None
+    select_related = None
+    prefetch_related = None
+    cache_objects = False
+    object_cache_timeout = None
+    
+    @classmethod
+    def as_view(cls, *initargs, **initkwargs):
+        """
+        Returns the view function, as ``View.as_view()`` does. If the view
+        caches objects or fragments, their invalidation is hooked up to the
+        model of its ``queryset`` now rather than on the first request; see
+        ``invalidate_on_change()``.
+        """
+        view = super(SingleObjectMixin, cls).as_view(*initargs, **initkwargs)
+        caching = (initkwargs.get('cache_objects', cls.cache_objects) or
+                   initkwargs.get('cache_fragments', getattr(cls, 'cache_fragments', False)))
+        queryset = initkwargs.get('queryset', cls.queryset)
+        if caching and hasattr(queryset, 'model'):
+            invalidate_on_change(queryset.model)
+        return view
     
     def get_object(self, pk=None, slug=None, queryset=None):
         """
@@ -17,12 +101,34 @@ class SingleObjectMixin(object):
         
         By default this requires `self.queryset` and a `pk` or `slug` argument 
         in the URLconf, but subclasses can override this to return any object.
+        
+        Unless a custom `queryset` is given, the object is only fetched once
+        per request however many times this is called, and if
+        `get_cache_objects()` is true it is also cached between requests.
         """
         # Use a custom queryset if provided; this is required for subclasses
         # like DateDetailView
-        if queryset is None:
-            queryset = self.get_queryset()
+        if queryset is not None:
+            return self._prefetch_related(self._get_object(pk, slug, queryset))
 
+        memo = self.__dict__.setdefault('_object_memo', {})
+        try:
+            return memo[(pk, slug)]
+        except KeyError:
+            pass
+        queryset = self.get_queryset()
+        if self.get_cache_objects() and hasattr(queryset, 'model'):
+            obj = self._get_cached_object(pk, slug, queryset)
+        else:
+            obj = self._get_object(pk, slug, queryset)
+        obj = self._prefetch_related(obj)
+        memo[(pk, slug)] = obj
+        return obj
+    
+    def _get_object(self, pk, slug, queryset):
+        """
+        Look the object up in the database.
+        """
         # Next, try looking up by primary key.
         if pk is not None:
             queryset = queryset.filter(pk=pk)
@@ -45,6 +151,67 @@ class SingleObjectMixin(object):
                           % (queryset.model._meta.verbose_name))
         return obj
     
+    def _prefetch_related(self, obj):
+        """
+        Fetch the relations named by ``get_prefetch_related()`` for ``obj``.
+        """
+        prefetch_related = self.get_prefetch_related()
+        if prefetch_related:
+            prefetch_related_objects([obj], prefetch_related)
+        return obj
+    
+    def _get_cached_object(self, pk, slug, queryset):
+        """
+        Look the object up in the cache, falling back to the database.
+        
+        Cached objects are keyed by the queryset's SQL as well as the primary
+        key, so views filtering the same model differently don't share them.
+        Slugs are mapped to primary keys, and the slug of the object found is
+        checked in case it has changed since.
+        
+        Only the object's own fields are cached. Related objects can change
+        without the object being saved, so ``select_related()`` is left out
+        of the query and relations are prefetched after the cache is read.
+        """
+        opts = queryset.model._meta
+        queryset = queryset._clone()
+        queryset.query.select_related = False
+        invalidate_on_change(queryset.model)
+        slug_field = self.get_slug_field()
+        base_key = md5_constructor(smart_str(repr(
+            (str(opts), queryset.db, str(queryset.query))))).hexdigest()
+        slug_key = None
+        if pk is None and slug is not None:
+            slug_key = 'class_based_views.object_slug.%s.%s' % (
+                base_key, md5_constructor(smart_str(slug)).hexdigest())
+            pk = cache.get(slug_key)
+
+        generation = None
+        if pk is not None:
+            try:
+                pk = opts.pk.to_python(pk)
+            except ValidationError:
+                return self._get_object(pk, slug, queryset)
+            generation = _get_generation(opts, pk)
+            key = 'class_based_views.object.%s.%s.%s' % (base_key, pk, generation)
+            obj = cache.get(key)
+            if obj is not None and (slug_key is None or
+                                    getattr(obj, slug_field, None) == slug):
+                return obj
+
+        if slug_key is None:
+            obj = self._get_object(pk, None, queryset)
+        else:
+            obj = self._get_object(None, slug, queryset)
+        timeout = self.get_object_cache_timeout()
+        if generation is None or obj.pk != pk:
+            generation = _get_generation(opts, obj.pk)
+        cache.set('class_based_views.object.%s.%s.%s' % (base_key, obj.pk, generation),
+                  obj, timeout)
+        if slug_key is not None:
+            cache.set(slug_key, obj.pk, timeout)
+        return obj
+    
     def get_queryset(self):
         """
         Get the queryset to look an object up against. May not be called if
@@ -56,7 +223,13 @@ class SingleObjectMixin(object):
                                        u"%(cls)s.get_object()." % {
                                             'cls': self.__class__.__name__
                                         })
-        return self.queryset._clone()
+        queryset = self.queryset._clone()
+        select_related = self.get_select_related()
+        if select_related is True:
+            queryset = queryset.select_related()
+        elif select_related:
+            queryset = queryset.select_related(*select_related)
+        return queryset
 
     def get_slug_field(self):
         """
@@ -64,6 +237,53 @@ class SingleObjectMixin(object):
         """
         return self.slug_field
     
+    def get_cache_objects(self):
+        """
+        Returns ``True`` if objects should be cached between requests. Cached
+        objects are invalidated whenever they are saved or deleted. Related
+        objects aren't cached with them.
+        """
+        return self.cache_objects
+    
+    def get_object_cache_timeout(self):
+        """
+        Get the number of seconds to cache objects for, or ``None`` for the
+        cache backend's default.
+        """
+        return self.object_cache_timeout
+    
+    def get_select_related(self):
+        """
+        Get the foreign keys to follow with ``select_related()`` when
+        fetching the object: a list of field names, ``True`` for all of them,
+        or ``None``.
+        """
+        return self.select_related
+    
+    def get_prefetch_related(self):
+        """
+        Get the names of the many-to-many fields to fetch along with the
+        object. See ``utils.prefetch_related_objects``.
+        """
+        return self.prefetch_related
+    
+    def get_last_modified(self, obj):
+        """
+        Get the datetime the object was last modified, for the
+        ``Last-Modified`` header, or ``None``. By default this is the value of
+        ``last_modified_field`` on the object, if that is set.
+        """
+        if self.last_modified_field is None:
+            return None
+        return getattr(obj, self.last_modified_field, None)
+    
+    def get_etag(self, obj):
+        """
+        Get an ETag for the object, or ``None`` to not send one. When
+        ``DetailView`` sends JSON, ``;json`` is added to it.
+        """
+        return None
+    
 
 class DetailView(SingleObjectMixin, TemplateView):
     """
@@ -74,11 +294,96 @@ class DetailView(SingleObjectMixin, TemplateView):
     """
     template_object_name = 'object'
     template_name_field = None
+    cache_fragments = False
+    fragment_cache_timeout = None
+    version_field = None
+    json_fields = None
     
     def GET(self, request, *args, **kwargs):
         obj = self.get_object(*args, **kwargs)
-        context = self.get_context(obj)
-        return self.render_to_response(self.get_template_names(obj), context)
+        json_fields = self.get_json_fields()
+        as_json = json_fields is not None and wants_json(request)
+        etag, last_modified = self.get_etag(obj), self.get_last_modified(obj)
+        if etag is not None and as_json:
+            # The JSON and the rendered template are different entities, so
+            # they mustn't validate each other.
+            etag = '%s;json' % etag
+        response = get_not_modified_response(request, etag, last_modified)
+        if response is None and as_json:
+            response = json_response(self.get_json_data(obj))
+        elif response is None:
+            template_names = self.get_template_names(obj)
+            key = None
+            if self.get_cache_fragments() and not self.get_stream():
+                key = self.get_fragment_cache_key(obj, template_names)
+            if key is None:
+                response = self.render_to_response(template_names, self.get_context(obj))
+            else:
+                content = cache.get(key)
+                if content is None:
+                    content = self.render(template_names, self.get_context(obj))
+                    cache.set(key, content, self.get_fragment_cache_timeout())
+                response = self.get_response(content)
+        if json_fields is not None:
+            patch_vary_headers(response, ('Accept',))
+        set_validator_headers(response, etag, last_modified)
+        return response
+    
+    def get_json_data(self, obj):
+        """
+        Get the data to send to clients asking for JSON: the fields from
+        ``get_json_fields()`` of the object.
+        """
+        return get_json_row(obj, self.get_json_fields())
+    
+    def get_json_fields(self):
+        """
+        Get the names of the fields to send to clients asking for JSON (see
+        ``utils.wants_json``), or ``None`` to always render the template.
+        """
+        return self.json_fields
+    
+    def get_cache_fragments(self):
+        """
+        Returns ``True`` if the rendered template should be cached per object.
+        Only turn this on for templates that don't depend on anything in the
+        request, such as the user, or on related objects, since the fragment
+        is only invalidated when the object itself is saved or deleted.
+        """
+        return self.cache_fragments
+    
+    def get_fragment_cache_timeout(self):
+        """
+        Get the number of seconds to cache rendered objects for, or ``None``
+        for the cache backend's default.
+        """
+        return self.fragment_cache_timeout
+    
+    def get_version(self, obj):
+        """
+        Get a value which changes whenever the object does, such as a last
+        modified time or a counter, or ``None``. By default this is the value
+        of ``version_field`` on the object, if that is set.
+        """
+        if self.version_field is None:
+            return None
+        return getattr(obj, self.version_field, None)
+    
+    def get_fragment_cache_key(self, obj, template_names):
+        """
+        Get the cache key for the object rendered with the given templates, or
+        ``None`` if it shouldn't be cached. The key is made from the view
+        class, the model, the primary key, ``get_version()`` and a token which
+        ``invalidate_cached_object()`` replaces, as ``UpdateView``,
+        ``BulkUpdateView`` and ``DeleteView`` do when they change the object.
+        """
+        if not hasattr(obj, '_meta'):
+            return None
+        generation = _get_generation(obj._meta, obj.pk)
+        bits = (self.__class__.__module__, self.__class__.__name__, str(obj._meta),
+                obj.pk, self.get_version(obj), generation, tuple(template_names))
+        return 'class_based_views.fragment.%s' % md5_constructor(
+            smart_str(repr(bits))).hexdigest()
     
     def get_context(self, obj):
         return {
@@ -1,7 +1,10 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router, transaction
 from django.http import HttpResponseRedirect
 from class_based_views import ListView
 from class_based_views.base import TemplateView
-from class_based_views.detail import SingleObjectMixin, DetailView
+from class_based_views.detail import (SingleObjectMixin, DetailView,
+                                      invalidate_cached_object)
 
 class FormMixin(object):
     """
@@ -54,6 +57,77 @@ class ModelFormMixin(SingleObjectMixin):
             )
     
 
+class FormSetMixin(object):
+    """
+    A mixin that provides a get_formset() method.
+    """
+    
+    formset = None
+    
+    def get_formset(self):
+        """
+        Returns the formset to be used in this view.
+        """
+        if self.request.method in ('POST', 'PUT'):
+            return self.formset(
+                self.request.POST,
+                self.request.FILES,
+                **self.get_formset_kwargs()
+            )
+        else:
+            return self.formset(**self.get_formset_kwargs())
+    
+    def get_formset_kwargs(self):
+        """
+        Returns any extra keyword arguments to instantiate the formset with.
+        """
+        return {}
+    
+
+class ModelFormSetMixin(FormSetMixin):
+    """
+    A derivative of FormSetMixin for model formsets, which edits the objects
+    in `self.queryset` and saves them all in a single transaction.
+    """
+    
+    queryset = None
+    
+    def get_queryset(self):
+        """
+        Get the queryset of objects the formset edits.
+        """
+        if self.queryset is None:
+            raise ImproperlyConfigured(u"%(cls)s is missing a queryset. Define "
+                                       u"%(cls)s.queryset, or override "
+                                       u"%(cls)s.get_queryset()." % {
+                                            'cls': self.__class__.__name__
+                                        })
+        return self.queryset._clone()
+    
+    def get_formset_kwargs(self):
+        return {
+            'queryset': self.get_queryset(),
+        }
+    
+    def formset_valid(self, formset):
+        objects = self.save_formset(formset)
+        return HttpResponseRedirect(self.redirect_to(objects))
+    
+    def formset_invalid(self, formset):
+        return self.render_to_response(context=self.get_context(formset))
+    
+    def save_formset(self, formset):
+        """
+        Save every form in the formset inside one transaction, so that either
+        all of the objects are written or none are. Returns the saved objects.
+        """
+        using = router.db_for_write(formset.model)
+        return transaction.commit_on_success(using=using)(formset.save)()
+    
+    def redirect_to(self, objects):
+        raise NotImplementedError("You must override redirect_to.")
+    
+
 class ProcessFormView(TemplateView, FormMixin):
     """
     A view that processes a form on POST.
@@ -88,6 +162,32 @@ class ProcessModelFormView(ModelFormMixin, ProcessFormView):
     """
     
 
+class ProcessFormSetView(TemplateView, FormSetMixin):
+    """
+    A view that processes a formset on POST.
+    """
+    def POST(self, request, *args, **kwargs):
+        formset = self.get_formset()
+        if formset.is_valid():
+            return self.formset_valid(formset)
+        else:
+            return self.formset_invalid(formset)
+    
+    PUT = POST
+    
+    def formset_valid(self, formset):
+        """
+        Called when every form in the submitted formset is valid.
+        """
+        raise NotImplementedError("You must override formset_valid.")
+    
+    def formset_invalid(self, formset):
+        """
+        Called when the submitted formset comes back with errors.
+        """
+        raise NotImplementedError("You must override formset_invalid.")
+    
+
 class DisplayFormView(TemplateView, FormMixin):
     """
     Displays a form for the user to edit and submit on GET.
@@ -102,6 +202,20 @@ class DisplayFormView(TemplateView, FormMixin):
         }
     
 
+class DisplayFormSetView(TemplateView, FormSetMixin):
+    """
+    Displays a formset for the user to edit and submit on GET.
+    """
+    def GET(self, request, *args, **kwargs):
+        formset = self.get_formset()
+        return self.render_to_response(context=self.get_context(formset))
+    
+    def get_context(self, formset):
+        return {
+            'formset': formset,
+        }
+    
+
 class DisplayModelFormView(ModelFormMixin, DisplayFormView):
     """
     Displays a ModelForm for the user to edit on GET.
@@ -130,6 +244,32 @@ class UpdateView(ModelFormMixin, DisplayModelFormView, ProcessModelFormView):
     """
     View for updating an object.
     """
+    def form_valid(self, form):
+        response = super(UpdateView, self).form_valid(form)
+        invalidate_cached_object(form.instance)
+        return response
+    
+
+class BulkCreateView(ModelFormSetMixin, DisplayFormSetView, ProcessFormSetView):
+    """
+    View for creating many objects at once with a model formset.
+    """
+    def get_formset_kwargs(self):
+        return {
+            'queryset': self.formset.model._default_manager.none(),
+        }
+    
+
+class BulkUpdateView(ModelFormSetMixin, DisplayFormSetView, ProcessFormSetView):
+    """
+    View for updating (and adding to) the objects in `self.queryset` at once
+    with a model formset.
+    """
+    def save_formset(self, formset):
+        objects = super(BulkUpdateView, self).save_formset(formset)
+        for obj in objects:
+            invalidate_cached_object(obj)
+        return objects
     
 
 class DeleteView(DetailView):
@@ -138,6 +278,8 @@ class DeleteView(DetailView):
     """    
     def DELETE(self, request, *args, **kwargs):
         obj = self.get_object(*args, **kwargs)
+        # Deleting the object clears its primary key, so do this first.
+        invalidate_cached_object(obj)
         obj.delete()
         return HttpResponseRedirect(self.redirect_to(obj))
 
@@ -0,0 +1,162 @@
+"""
+Per-stage timing for class-based views.
+
+A view with ``instrumentation_sinks`` records, for each request, how long each
+of the stages in ``instrumented_stages`` took and how many queries it ran,
+and hands the spans to every sink. A sink is any object with a
+``record(view, spans)`` method, where ``spans`` is a list of
+``(stage, seconds, queries)`` tuples in the order the stages finished.
+
+Times include any stages called from within a stage; ``dispatch`` covers the
+whole request. Query counts are only available with ``DEBUG`` on, when Django
+records queries, and are ``None`` otherwise. Streamed templates are rendered
+after the view returns, so their rendering time isn't recorded.
+
+Views without sinks aren't touched, so instrumentation costs nothing unless
+it's turned on.
+"""
+import bisect
+import logging
+import socket
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+
+def dispatch_instrumented(view, request, *args, **kwargs):
+    """
+    Dispatch the request to ``view``, recording spans for its stages and
+    passing them to its sinks.
+    """
+    spans = []
+    for stage in view.instrumented_stages:
+        method = getattr(view, stage, None)
+        if method is not None:
+            # Shadow the method on this instance only; calls through super()
+            # from within the stage aren't counted twice.
+            setattr(view, stage, _timed(stage, method, spans))
+    try:
+        return view.dispatch(request, *args, **kwargs)
+    finally:
+        for sink in view.instrumentation_sinks:
+            try:
+                sink.record(view, spans)
+            except Exception:
+                logging.getLogger('class_based_views.instrumentation').exception(
+                    "Instrumentation sink %r failed" % sink)
+
+def _timed(stage, method, spans):
+    """
+    Helper: wrap ``method`` so that each call appends a span to ``spans``.
+    """
+    def timed(*args, **kwargs):
+        queries = _query_count()
+        start = time.time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            seconds = time.time() - start
+            if queries is not None:
+                queries = _query_count() - queries
+            spans.append((stage, seconds, queries))
+    return timed
+
+def _query_count():
+    """
+    Helper: the number of queries run so far on every connection, or ``None``
+    if queries aren't being recorded.
+    """
+    if not settings.DEBUG:
+        return None
+    return sum([len(connection.queries) for connection in connections.all()])
+
+def _view_name(view):
+    return '%s.%s' % (view.__class__.__module__, view.__class__.__name__)
+
+class LoggingSink(object):
+    """
+    Logs one line per request listing the time and query count of each stage.
+    """
+    def __init__(self, logger='class_based_views.instrumentation', level=logging.INFO):
+        self.logger = logging.getLogger(logger)
+        self.level = level
+
+    def record(self, view, spans):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        bits = []
+        for stage, seconds, queries in spans:
+            if queries is None:
+                bits.append('%s %.1fms' % (stage, seconds * 1000))
+            else:
+                bits.append('%s %.1fms/%dq' % (stage, seconds * 1000, queries))
+        self.logger.log(self.level, '%s %s', _view_name(view), ', '.join(bits))
+
+
+class StatsdSink(object):
+    """
+    Sends each stage's time as a statsd timer, and its query count as a
+    counter, to a collector over UDP, named
+    ``<prefix>.<module>.<view class>.<stage>``. Sending is fire-and-forget:
+    if the collector is down the metrics are lost but the request isn't
+    affected.
+    """
+    def __init__(self, host='127.0.0.1', port=8125, prefix='views'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def record(self, view, spans):
+        name = '%s.%s' % (self.prefix, _view_name(view))
+        lines = []
+        for stage, seconds, queries in spans:
+            lines.append('%s.%s:%.3f|ms' % (name, stage, seconds * 1000))
+            if queries is not None:
+                lines.append('%s.%s.queries:%d|c' % (name, stage, queries))
+        try:
+            self.socket.sendto('\n'.join(lines), self.address)
+        except socket.error:
+            pass
+
+
+class MemorySink(object):
+    """
+    Keeps a histogram of the times of each stage of each view in memory.
+
+    ``histograms`` maps ``(view name, stage)`` to a dictionary of the
+    ``count`` of spans, their ``total`` seconds and ``queries``, and
+    ``buckets``: the number of spans that took up to each of
+    ``bucket_bounds`` seconds, with a final bucket for anything slower.
+    """
+    bucket_bounds = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forget everything recorded so far.
+        """
+        self.histograms = {}
+
+    def record(self, view, spans):
+        name = _view_name(view)
+        self.lock.acquire()
+        try:
+            for stage, seconds, queries in spans:
+                histogram = self.histograms.get((name, stage))
+                if histogram is None:
+                    histogram = self.histograms[(name, stage)] = {
+                        'count': 0,
+                        'total': 0.0,
+                        'queries': 0,
+                        'buckets': [0] * (len(self.bucket_bounds) + 1),
+                    }
+                histogram['count'] += 1
+                histogram['total'] += seconds
+                histogram['queries'] += queries or 0
+                histogram['buckets'][bisect.bisect_left(self.bucket_bounds, seconds)] += 1
+        finally:
+            self.lock.release()
+
@@ -1,8 +1,20 @@
+import base64
+import datetime
+import itertools
 from class_based_views.base import TemplateView
-from django.core.paginator import Paginator, InvalidPage
-from django.core.exceptions import ImproperlyConfigured
+from class_based_views.utils import (get_json_rows, has_items, json_response,
+                                     prefetch_related_objects, wants_json)
+from django.core.cache import cache
+from django.core.paginator import Paginator, InvalidPage, Page
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connections
+from django.db.models import Model, Q
+from django.db.models.query import EmptyQuerySet
 from django.http import Http404
+from django.utils import simplejson
+from django.utils.cache import patch_vary_headers
 from django.utils.encoding import smart_str
+from django.utils.hashcompat import md5_constructor
 
 class ListView(TemplateView):
     """
@@ -12,20 +24,63 @@ class ListView(TemplateView):
     allow_empty = True
     template_object_name = None
     queryset = None
+    select_related = None
+    prefetch_related = None
+    json_fields = None
+    fields = None
+    row_mode = 'values'
     
     def GET(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         allow_empty = self.get_allow_empty()
-        if not allow_empty and len(queryset) == 0:
+        if not allow_empty and not has_items(queryset):
             raise Http404(u"Empty list and '%s.allow_empty' is False."
                           % self.__class__.__name__)
+        if self.get_json_fields() is not None:
+            if wants_json(request):
+                return json_response(self.get_json_data(queryset))
+            response = self.render_to_response(self.get_template_names(queryset),
+                                               self.get_context(queryset))
+            patch_vary_headers(response, ('Accept',))
+            return response
         context = self.get_context(queryset)
         return self.render_to_response(self.get_template_names(queryset), context)
     
+    def get_json_data(self, queryset):
+        """
+        Get the data to send to clients asking for JSON. By default this is
+        ``{"object_list": [...]}``, holding the fields from
+        ``get_json_fields()`` of each item.
+        """
+        return {
+            'object_list': get_json_rows(queryset, self.get_json_fields()),
+        }
+    
+    def get_json_fields(self):
+        """
+        Get the names of the fields to send to clients asking for JSON (see
+        ``utils.wants_json``), or ``None`` to always render the template.
+        Querysets are read with ``values()``, so neither model instances nor
+        templates are involved.
+        """
+        return self.json_fields
+    
     def get_context(self, queryset):
         """
         Get the context for this view.
         """
+        prefetch_related = self.get_prefetch_related()
+        if self.get_fields() is not None and hasattr(queryset, 'model'):
+            queryset = self.get_rows(queryset)
+        if self.get_stream() and hasattr(queryset, 'iterator'):
+            # Don't let the queryset cache its results; they'll be rendered
+            # and thrown away one at a time.
+            queryset = _QuerySetIterable(queryset, prefetch_related)
+        elif prefetch_related and hasattr(queryset, 'model'):
+            queryset = _PrefetchedList(queryset, prefetch_related)
+        elif prefetch_related and _is_model_list(queryset):
+            # A page of objects, such as a keyset page, may be a plain list.
+            queryset = prefetch_related_objects(queryset, prefetch_related)
         context = {
             'object_list': queryset,
         }
@@ -46,8 +101,76 @@ class ListView(TemplateView):
                                        % self.__class__.__name__)
         if hasattr(queryset, '_clone'):
             queryset = queryset._clone()
+            select_related = self.get_select_related()
+            if select_related is True:
+                queryset = queryset.select_related()
+            elif select_related:
+                queryset = queryset.select_related(*select_related)
         return queryset
     
+    def get_rows(self, queryset):
+        """
+        Get the rows to put in the context in place of the model instances of
+        ``queryset``, holding only the fields from ``get_fields()``. What they
+        are depends on ``get_row_mode()``:
+        
+            * ``'values'``: dictionaries, from ``queryset.values()``.
+            
+            * ``'only'``: model instances with the other fields deferred, from
+              ``queryset.only()``.
+            
+            * ``'slots'``: objects of a small class with ``__slots__`` for the
+              fields, built from ``queryset.values_list()``.
+        
+        Only ``'only'`` rows can have relations prefetched. The rows keep the
+        queryset's ``model``, so template and context names are unchanged.
+        """
+        fields = self.get_fields()
+        row_mode = self.get_row_mode()
+        if row_mode not in ('values', 'only', 'slots'):
+            raise ImproperlyConfigured(u"'%s' has an invalid row_mode %r."
+                                       % (self.__class__.__name__, row_mode))
+        if row_mode != 'only' and self.get_prefetch_related():
+            raise ImproperlyConfigured(u"'%s' can't prefetch relations for %r rows."
+                                       % (self.__class__.__name__, row_mode))
+        if isinstance(queryset, EmptyQuerySet):
+            return queryset
+        if row_mode == 'values':
+            return queryset.values(*fields)
+        if row_mode == 'only':
+            return queryset.only(*fields)
+        return _SlotsRows(queryset.values_list(*fields),
+                          _get_row_class(queryset.model, fields))
+    
+    def get_fields(self):
+        """
+        Get the names of the only fields the template uses, or ``None`` to
+        give it whole model instances. See ``get_rows()``.
+        """
+        return self.fields
+    
+    def get_row_mode(self):
+        """
+        Get the kind of rows to use when ``get_fields()`` is set:
+        ``'values'``, ``'only'`` or ``'slots'``.
+        """
+        return self.row_mode
+    
+    def get_select_related(self):
+        """
+        Get the foreign keys to follow with ``select_related()`` when
+        fetching the objects: a list of field names, ``True`` for all of
+        them, or ``None``.
+        """
+        return self.select_related
+    
+    def get_prefetch_related(self):
+        """
+        Get the names of the many-to-many fields to fetch for all the
+        displayed objects at once. See ``utils.prefetch_related_objects``.
+        """
+        return self.prefetch_related
+    
     def get_allow_empty(self):
         """
         Returns ``True`` if the view should display empty lists, and ``False``
@@ -86,11 +209,19 @@ class ListView(TemplateView):
 
 class PaginatedListView(ListView):
     paginate_by = None
+    keyset_pagination = False
+    count_strategy = 'exact'
+    count_cache_timeout = 300
     
     def get_context(self, queryset):
         page = self.kwargs.get('page', None)
-        paginator, page, queryset = self.paginate_queryset(queryset, page)
-        context = super(PaginatedListView, self).get_context(queryset)
+        paginator, page, object_list = self.paginate_queryset(queryset, page)
+        context = super(PaginatedListView, self).get_context(object_list)
+        # A page's object_list may be a plain list, so name it after the
+        # full queryset.
+        template_object_name = self.get_template_object_name(queryset)
+        if template_object_name is not None:
+            context[template_object_name] = context['object_list']
         context.update({
             'paginator': paginator,
             'page_obj': page,
@@ -98,12 +229,37 @@ class PaginatedListView(ListView):
         })
         return context
     
+    def get_json_data(self, queryset):
+        """
+        Get the data to send to clients asking for JSON: the rows of the
+        requested page, with the page number and count or, for keyset
+        pagination, the cursors of the neighbouring pages.
+        """
+        page = self.kwargs.get('page', None)
+        paginator, page, object_list = self.paginate_queryset(queryset, page)
+        data = super(PaginatedListView, self).get_json_data(object_list)
+        if isinstance(page, KeysetPage):
+            data.update({
+                'next_cursor': page.next_cursor,
+                'previous_cursor': page.previous_cursor,
+            })
+        elif page is not None:
+            data.update({
+                'page': page.number,
+                'num_pages': paginator.num_pages,
+                'count': paginator.count,
+            })
+        return data
+    
     def paginate_queryset(self, queryset, page):
         """
         Paginate the queryset, if needed.
         """
         paginate_by = self.get_paginate_by(queryset)
-        paginator = Paginator(queryset, paginate_by, allow_empty_first_page=self.get_allow_empty())
+        if self.get_keyset_pagination():
+            return self.paginate_queryset_by_keyset(queryset, page, paginate_by)
+        paginator = self.get_paginator(queryset, paginate_by,
+                                       allow_empty_first_page=self.get_allow_empty())
         page = page or self.request.GET.get('page', 1)
         try:
             page_number = int(page)
@@ -118,9 +274,446 @@ class PaginatedListView(ListView):
         except InvalidPage:
             raise Http404('Invalid page (%s)' % page_number)
     
+    def get_paginator(self, queryset, per_page, allow_empty_first_page=True):
+        """
+        Get a paginator for the queryset, counting it according to
+        ``get_count_strategy()``.
+        """
+        count = self.get_count(queryset)
+        if count is None:
+            return Paginator(queryset, per_page,
+                             allow_empty_first_page=allow_empty_first_page)
+        return _CountedPaginator(queryset, per_page, count,
+                                 allow_empty_first_page=allow_empty_first_page)
+    
+    def get_count(self, queryset):
+        """
+        Returns the number of items in the queryset as given by the count
+        strategy, or ``None`` to leave counting to the paginator. The
+        strategies are:
+        
+            * ``'exact'``: a ``COUNT(*)`` on every request.
+            
+            * ``'cached'``: the exact count, kept in the cache for
+              ``count_cache_timeout`` seconds under a key made from the
+              queryset's SQL.
+            
+            * ``'estimate'``: the row count from the database's table
+              statistics, where the backend has them and the queryset covers
+              the whole table; otherwise the cached count.
+        
+        Cached and estimated counts can be out of date, so the last page may
+        come up short of (or miss) the objects added since.
+        """
+        strategy = self.get_count_strategy()
+        if strategy == 'exact' or not hasattr(queryset, 'query'):
+            return None
+        if strategy == 'estimate':
+            count = _estimate_count(queryset)
+            if count is not None:
+                return count
+        elif strategy != 'cached':
+            raise ImproperlyConfigured(u"'%s' has an invalid count_strategy %r."
+                                       % (self.__class__.__name__, strategy))
+        key = 'class_based_views.count.%s' % md5_constructor(
+            smart_str(queryset.query)).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+    
+    def paginate_queryset_by_keyset(self, queryset, page, paginate_by):
+        """
+        Paginate the queryset by filtering on the values of its ordering
+        fields rather than with an offset, so that every page costs the same
+        and no count is needed. ``page`` is a cursor taken from the previous
+        page's ``next_cursor`` or ``previous_cursor``; the first page has none.
+        
+        The cursors are read from model instances, so this can't be combined
+        with ``fields``.
+        """
+        if self.get_fields() is not None:
+            raise ImproperlyConfigured(u"'%s' can't use fields with keyset pagination."
+                                       % self.__class__.__name__)
+        paginator = KeysetPaginator(queryset, paginate_by)
+        page = page or self.request.GET.get('page', None)
+        try:
+            page = paginator.page(page)
+        except InvalidPage:
+            raise Http404('Invalid page cursor (%s)' % page)
+        return (paginator, page, page.object_list)
+    
     def get_paginate_by(self, queryset):
         """
         Get the number of items to paginate by, or ``None`` for no pagination.
         """
         return self.paginate_by
     
+    def get_count_strategy(self):
+        """
+        Get the name of the strategy used to count the objects for
+        pagination: ``'exact'``, ``'cached'`` or ``'estimate'``.
+        """
+        return self.count_strategy
+    
+    def get_keyset_pagination(self):
+        """
+        Returns ``True`` if the view should paginate using cursors over the
+        queryset ordering instead of page numbers.
+        """
+        return self.keyset_pagination
+    
+
+class _CountedPaginator(Paginator):
+    """
+    Helper: a paginator given its (possibly approximate) count up front.
+    Pages aren't cut short at the count, in case it's too low.
+    """
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super(_CountedPaginator, self).__init__(object_list, per_page, **kwargs)
+        self._count = count
+    
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return Page(self.object_list[bottom:bottom + self.per_page], number, self)
+    
+
+def _estimate_count(queryset):
+    """
+    Helper: get the number of rows in an unfiltered queryset's table from the
+    database's statistics, or ``None`` if that isn't possible.
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.low_mark or query.high_mark is not None:
+        return None
+    engine = connections[queryset.db].settings_dict['ENGINE']
+    table = queryset.model._meta.db_table
+    if 'postgresql' in engine:
+        sql = "SELECT reltuples FROM pg_class WHERE relname = %s"
+    elif 'mysql' in engine:
+        sql = ("SELECT table_rows FROM information_schema.tables "
+               "WHERE table_schema = DATABASE() AND table_name = %s")
+    else:
+        return None
+    cursor = connections[queryset.db].cursor()
+    cursor.execute(sql, [table])
+    row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    return int(row[0])
+
+class KeysetPaginator(object):
+    """
+    Paginates a queryset by its ordering: each page picks up after (or
+    before) the ordering values of the row at the edge of the page it was
+    reached from. The primary key is added to the ordering if it isn't
+    already there so that rows are never skipped or repeated.
+    
+    Null values in the ordering fields aren't supported.
+    """
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = self._get_ordering(queryset)
+        self.fields = [_get_ordering_field(queryset.model, f.lstrip('-'))
+                       for f in self.ordering]
+    
+    def page(self, cursor=None):
+        """
+        Returns a ``KeysetPage`` for the given cursor, or the first page if
+        no cursor is given. Raises ``InvalidPage`` for a malformed cursor.
+        """
+        if not cursor:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self,
+                              has_next=len(rows) > self.per_page,
+                              has_previous=False)
+        
+        direction, values = self._decode_cursor(cursor)
+        if direction == 'n':
+            qs = self.queryset.filter(self._seek(values, reverse=False))
+            rows = list(qs.order_by(*self.ordering)[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self,
+                              has_next=len(rows) > self.per_page,
+                              has_previous=True)
+        else:
+            ordering = [_reverse_ordering(f) for f in self.ordering]
+            qs = self.queryset.filter(self._seek(values, reverse=True))
+            rows = list(qs.order_by(*ordering)[:self.per_page + 1])
+            object_list = rows[:self.per_page]
+            object_list.reverse()
+            return KeysetPage(object_list, self,
+                              has_next=True,
+                              has_previous=len(rows) > self.per_page)
+    
+    def get_cursor(self, obj, direction):
+        """
+        Returns the cursor for the page after (``direction='n'``) or before
+        (``direction='p'``) the given object.
+        """
+        values = [_cursor_value(_get_ordering_value(obj, f.lstrip('-')))
+                  for f in self.ordering]
+        return base64.urlsafe_b64encode(simplejson.dumps([direction, values]))
+    
+    def _decode_cursor(self, cursor):
+        """
+        Returns the direction and the ordering values of a cursor. The values
+        come from the client, so each is checked and converted by its field.
+        """
+        try:
+            direction, values = simplejson.loads(base64.urlsafe_b64decode(str(cursor)))
+            if (direction not in ('n', 'p') or not isinstance(values, list)
+                    or len(values) != len(self.ordering)):
+                raise ValueError
+            values = [_cursor_to_python(field, value)
+                      for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, UnicodeEncodeError, ValidationError):
+            raise InvalidPage(u"Invalid cursor %r" % cursor)
+        return direction, values
+    
+    def _seek(self, values, reverse):
+        """
+        Build the filter for rows strictly after the given ordering values
+        (or strictly before them if ``reverse`` is true): for an ordering of
+        ``(a, b)`` that's ``a > va OR (a = va AND b > vb)``.
+        """
+        q = None
+        for i, field in enumerate(self.ordering):
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            if descending != reverse:
+                term = Q(**{'%s__lt' % name: values[i]})
+            else:
+                term = Q(**{'%s__gt' % name: values[i]})
+            for previous, value in zip(self.ordering[:i], values):
+                term &= Q(**{previous.lstrip('-'): value})
+            if q is None:
+                q = term
+            else:
+                q |= term
+        return q
+    
+    def _get_ordering(self, queryset):
+        query = queryset.query
+        if query.order_by:
+            ordering = list(query.order_by)
+        elif query.default_ordering:
+            ordering = list(queryset.model._meta.ordering)
+        else:
+            ordering = []
+        for field in ordering:
+            if field == '?' or '.' in field:
+                raise ImproperlyConfigured(u"Can't paginate by keyset over the "
+                                           u"ordering %r." % field)
+        pk_name = queryset.model._meta.pk.name
+        if not [f for f in ordering if f.lstrip('-') in ('pk', pk_name)]:
+            ordering.append('pk')
+        return ordering
+    
+
+class KeysetPage(object):
+    """
+    A page of objects from a ``KeysetPaginator``. Links to the neighbouring
+    pages are given by ``next_cursor`` and ``previous_cursor``.
+    """
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+    
+    def __repr__(self):
+        return '<Keyset page of %s objects>' % len(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    def has_next(self):
+        return self._has_next
+    
+    def has_previous(self):
+        return self._has_previous
+    
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+    
+    def _get_next_cursor(self):
+        if self.has_next():
+            return self.paginator.get_cursor(self.object_list[-1], 'n')
+        return None
+    next_cursor = property(_get_next_cursor)
+    
+    def _get_previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.get_cursor(self.object_list[0], 'p')
+        return None
+    previous_cursor = property(_get_previous_cursor)
+    
+
+def _reverse_ordering(field):
+    """
+    Helper: flip the direction of an ``order_by()`` field name.
+    """
+    if field.startswith('-'):
+        return field[1:]
+    return '-' + field
+
+def _get_ordering_value(obj, name):
+    """
+    Helper: get the value of an ordering field, following ``__`` across
+    relations.
+    """
+    for bit in name.split('__'):
+        obj = getattr(obj, bit)
+    return obj
+
+def _get_ordering_field(model, name):
+    """
+    Helper: get the field an ordering field name refers to, following
+    ``__`` across relations.
+    """
+    bits = name.split('__')
+    for bit in bits[:-1]:
+        model = model._meta.get_field(bit).rel.to
+    if bits[-1] == 'pk':
+        return model._meta.pk
+    return model._meta.get_field(bits[-1])
+
+def _cursor_to_python(field, value):
+    """
+    Helper: convert an ordering value from a cursor back into a query value
+    for its field. Raises ``ValueError`` for anything that isn't a single
+    non-null value.
+    """
+    if value is None or not isinstance(value, (int, long, float, basestring)):
+        raise ValueError("Invalid cursor value %r" % value)
+    value = field.to_python(value)
+    if value is None:
+        raise ValueError("Invalid cursor value")
+    return field.get_prep_value(value)
+
+def _cursor_value(value):
+    """
+    Helper: make an ordering value JSON serializable without losing
+    precision.
+    """
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, (int, long, float, basestring)):
+        return value
+    return unicode(value)
+
+def _is_model_list(items):
+    """
+    Helper: returns ``True`` if ``items`` is a non-empty list of model
+    instances.
+    """
+    return isinstance(items, list) and bool(items) and isinstance(items[0], Model)
+
+class _PrefetchedList(list):
+    """
+    Helper: the objects of a queryset with their many-to-many relations
+    prefetched, keeping the queryset's ``model`` for introspection.
+    """
+    def __init__(self, queryset, names):
+        super(_PrefetchedList, self).__init__(
+            prefetch_related_objects(queryset, names))
+        self.model = queryset.model
+
+class _QuerySetIterable(object):
+    """
+    Helper: wraps a queryset so that every iteration over it goes through
+    ``queryset.iterator()``. It has no length, which ``TemplateView.render_iter``
+    uses to render ``{% for %}`` loops over it one row at a time. Its truth
+    value is checked with ``exists()``, so ``{% if object_list %}`` works
+    without fetching the rows.
+    
+    If ``prefetch_related`` is given, relations are prefetched for each batch
+    of ``batch_size`` rows as they are read.
+    """
+    batch_size = 100
+    
+    def __init__(self, queryset, prefetch_related=None):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.prefetch_related = prefetch_related
+    
+    def __nonzero__(self):
+        return has_items(self.queryset)
+    
+    def __iter__(self):
+        if not self.prefetch_related:
+            return self.queryset.iterator()
+        return self._iter_batches()
+    
+    def _iter_batches(self):
+        batch = []
+        for obj in self.queryset.iterator():
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                for obj in prefetch_related_objects(batch, self.prefetch_related):
+                    yield obj
+                batch = []
+        for obj in prefetch_related_objects(batch, self.prefetch_related):
+            yield obj
+
+# Row classes for 'slots' rows, keyed by model and field names.
+_row_classes = {}
+
+def _get_row_class(model, fields):
+    """
+    Helper: get a class with ``__slots__`` for the given fields of a model,
+    instantiated with the field values in order.
+    """
+    key = (model, tuple(fields))
+    try:
+        return _row_classes[key]
+    except KeyError:
+        pass
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, ', '.join(
+            ['%s=%r' % (name, getattr(self, name)) for name in self.__slots__]))
+    row_class = type('%sRow' % model._meta.object_name, (object,), {
+        '__slots__': tuple(fields),
+        '__init__': __init__,
+        '__repr__': __repr__,
+    })
+    _row_classes[key] = row_class
+    return row_class
+
+class _SlotsRows(object):
+    """
+    Helper: the rows of a ``values_list()`` queryset as instances of a row
+    class, keeping the queryset's ``model`` for introspection. ``iterator()``
+    reads them without caching, for streaming.
+    """
+    def __init__(self, queryset, row_class):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.row_class = row_class
+    
+    def __iter__(self):
+        row_class = self.row_class
+        for values in self.queryset:
+            yield row_class(*values)
+    
+    def __len__(self):
+        return len(self.queryset)
+    
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self.row_class(*values) for values in self.queryset[k]]
+        return self.row_class(*self.queryset[k])
+    
+    def exists(self):
+        return self.queryset.exists()
+    
+    def iterator(self):
+        return itertools.starmap(self.row_class, self.queryset.iterator())
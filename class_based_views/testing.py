@@ -0,0 +1,96 @@
+from class_based_views.base import QueryBudgetExceeded
+from django.conf import settings
+from django.core.signals import request_started
+from django.core.urlresolvers import NoReverseMatch, RegexURLResolver, get_resolver, reverse
+from django.db import connections
+from django.test.client import Client
+
+def assert_query_budgets(paths=(), urlconf=None, client=None):
+    """
+    Assert that every view in a URLconf with a ``max_queries`` budget stays
+    within it.
+
+    Each such view is requested with a GET from a test client, with ``DEBUG``
+    on so that queries are recorded. Patterns without arguments are requested
+    at their own URL; patterns with arguments are requested at whichever of
+    ``paths`` they match, and there must be at least one. Raises
+    ``AssertionError`` listing the queries if a view goes over its budget, or
+    naming the pattern if a view with a budget has no path to request or
+    doesn't give a 2xx or 3xx response.
+    """
+    if urlconf is None:
+        urlconf = settings.ROOT_URLCONF
+    resolver = get_resolver(urlconf)
+    targets = {}
+    for path in paths:
+        callback = resolver.resolve(path)[0]
+        targets.setdefault(callback, []).append(path)
+    for regex, callback in _iter_patterns(resolver):
+        if _get_budget(callback) is None or callback in targets:
+            continue
+        try:
+            targets[callback] = [reverse(callback, urlconf=urlconf)]
+        except NoReverseMatch:
+            raise AssertionError(u"No path given for the pattern %r, whose view "
+                                 u"has a query budget." % regex)
+
+    if client is None:
+        client = Client()
+    old_debug, old_urlconf = settings.DEBUG, settings.ROOT_URLCONF
+    settings.DEBUG, settings.ROOT_URLCONF = True, urlconf
+    try:
+        for callback, callback_paths in targets.items():
+            budget = _get_budget(callback)
+            if budget is None:
+                continue
+            for path in callback_paths:
+                # Count from the start of the request, after Django has reset
+                # the query log for it.
+                before = {}
+                def request_started_receiver(**kwargs):
+                    for alias in connections:
+                        before[alias] = len(connections[alias].queries)
+                request_started.connect(request_started_receiver, weak=False)
+                try:
+                    try:
+                        response = client.get(path)
+                    except QueryBudgetExceeded, e:
+                        raise AssertionError(u"%s: %s" % (path, e))
+                finally:
+                    request_started.disconnect(request_started_receiver)
+                if not 200 <= response.status_code < 400:
+                    raise AssertionError(u"%s: %s returned a %d response."
+                                         % (path, callback.view_class.__name__,
+                                            response.status_code))
+                queries = []
+                for alias, count in before.items():
+                    queries.extend([q['sql'] for q in connections[alias].queries[count:]])
+                # The view may only log when it goes over, so check here too.
+                if len(queries) > budget:
+                    raise AssertionError(u"%s: %s ran %d queries, over its budget of %d:\n%s"
+                                         % (path, callback.view_class.__name__,
+                                            len(queries), budget, u'\n'.join(queries)))
+    finally:
+        settings.DEBUG, settings.ROOT_URLCONF = old_debug, old_urlconf
+
+def _iter_patterns(resolver, prefix=''):
+    """
+    Helper: yield the regex and callback of every pattern in a resolver,
+    following includes.
+    """
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, RegexURLResolver):
+            for item in _iter_patterns(pattern, prefix + pattern.regex.pattern):
+                yield item
+        else:
+            yield prefix + pattern.regex.pattern, pattern.callback
+
+def _get_budget(callback):
+    """
+    Helper: get the query budget of a view made by ``View.as_view()``, or
+    ``None``.
+    """
+    view_class = getattr(callback, 'view_class', None)
+    if view_class is None:
+        return None
+    return callback.view_initkwargs.get('max_queries', view_class.max_queries)
@@ -0,0 +1,201 @@
+"""
+Benchmarks for the generic views.
+
+Drives the views in ``class_based_views.tests.views`` through a
+``RequestFactory`` against an SQLite test database seeded with a given number
+of authors and books, and prints the results as JSON so that runs from
+different commits can be compared:
+
+    $ ./run_benchmarks.sh --sizes 1000,100000 --output before.json
+
+For each dataset size and view this reports requests per second, the 50th and
+99th percentile latency, the number of queries per request and the peak
+resident memory of the process so far (which only ever grows, so run one size
+at a time to compare memory use between sizes).
+
+Data is generated deterministically, so the same arguments always run the
+same requests against the same rows. Each view is run for ``--requests``
+requests, or for as many as fit in ``--max-seconds`` (but at least
+``--min-requests``) so that views which render every row stay bounded on
+large datasets.
+"""
+import datetime
+import os
+import platform
+import resource
+import sys
+import time
+from optparse import OptionParser
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'class_based_views.tests.settings')
+
+from class_based_views.tests import views
+from class_based_views.tests.models import Author, Book
+from class_based_views.tests.utils import RequestFactory
+
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import simplejson
+
+BATCH_SIZE = 10000
+
+# (name, view, method, path, data, kwargs)
+SCENARIOS = [
+    ('AuthorList', views.AuthorList.as_view(), 'get', '/list/authors/', {}, {}),
+    ('PaginatedAuthorList', views.PaginatedAuthorList.as_view(paginate_by=30),
+        'get', '/list/authors/paginated/', {'page': '2'}, {}),
+    ('AuthorDetail', views.AuthorDetail.as_view(), 'get', '/detail/author/1/', {},
+        {'pk': '1'}),
+    ('BookArchive', views.BookArchive.as_view(), 'get', '/dates/books/', {}, {}),
+    ('BookMonthArchive', views.BookMonthArchive.as_view(), 'get',
+        '/dates/books/2008/oct/', {}, {'year': '2008', 'month': 'oct'}),
+    ('AuthorCreate', views.AuthorCreate.as_view(), 'post', '/edit/authors/create/',
+        {'name': 'New Author', 'slug': 'new-author'}, {}),
+]
+
+def seed(size):
+    """
+    Replace the contents of the author and book tables with ``size`` rows
+    each. Every book has one author, and publication dates are spread evenly
+    over 2000-2009 whatever the size.
+    """
+    qn = connection.ops.quote_name
+    through = Book.authors.through
+    cursor = connection.cursor()
+    for model in (through, Book, Author):
+        cursor.execute('DELETE FROM %s' % qn(model._meta.db_table))
+
+    first_day = datetime.date(2000, 1, 1)
+    _insert(cursor, Author, ['id', 'name', 'slug'], [
+        (i, 'Author %07d' % i, 'author-%d' % i) for i in xrange(1, size + 1)
+    ])
+    _insert(cursor, Book, ['id', 'name', 'slug', 'pages', 'pubdate'], [
+        (i, 'Book %07d' % i, 'book-%d' % i, 100 + i % 900,
+         first_day + datetime.timedelta(days=(i - 1) * 3650 // size))
+        for i in xrange(1, size + 1)
+    ])
+    _insert(cursor, through, ['book', 'author'], [
+        (i, i) for i in xrange(1, size + 1)
+    ])
+    transaction.commit_unless_managed()
+
+def _insert(cursor, model, names, rows):
+    """
+    Insert rows into the model's table, ``BATCH_SIZE`` at a time.
+    """
+    qn = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in names]
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        qn(model._meta.db_table),
+        ', '.join([qn(column) for column in columns]),
+        ', '.join(['%s'] * len(columns)),
+    )
+    for start in xrange(0, len(rows), BATCH_SIZE):
+        cursor.executemany(sql, rows[start:start + BATCH_SIZE])
+
+def run_scenario(scenario, requests, min_requests, max_seconds):
+    """
+    Run one view repeatedly and return its results.
+    """
+    name, view, method, path, data, kwargs = scenario
+    rf = RequestFactory()
+    make_request = getattr(rf, method)
+
+    def call():
+        response = view(make_request(path, data), **kwargs)
+        if response.status_code not in (200, 302):
+            raise AssertionError("%s returned %s" % (name, response.status_code))
+        # Make sure lazily rendered content is included in the timing.
+        response.content
+
+    for i in range(3):
+        call()
+
+    latencies = []
+    started = time.time()
+    while len(latencies) < requests:
+        request_started = time.time()
+        call()
+        latencies.append(time.time() - request_started)
+        if len(latencies) >= min_requests and time.time() - started > max_seconds:
+            break
+    elapsed = time.time() - started
+
+    old_debug, settings.DEBUG = settings.DEBUG, True
+    connection.queries = []
+    try:
+        call()
+        queries = len(connection.queries)
+    finally:
+        settings.DEBUG = old_debug
+        connection.queries = []
+
+    latencies.sort()
+    return {
+        'view': name,
+        'requests': len(latencies),
+        'req_per_sec': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 3),
+        'queries_per_request': queries,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+def _percentile(values, percent):
+    """
+    Helper: the given percentile of a sorted list, by the nearest rank.
+    """
+    index = int(round(percent / 100.0 * (len(values) - 1)))
+    return values[index]
+
+def main(argv=None):
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option('--sizes', default='1000,100000,1000000',
+                      help="comma-separated numbers of rows to seed [%default]")
+    parser.add_option('--views', default='',
+                      help="comma-separated names of the views to run [all]")
+    parser.add_option('--requests', type='int', default=200,
+                      help="requests per view [%default]")
+    parser.add_option('--min-requests', type='int', default=5,
+                      help="requests per view however long they take [%default]")
+    parser.add_option('--max-seconds', type='float', default=10.0,
+                      help="stop a view after this long [%default]")
+    parser.add_option('--output', default=None,
+                      help="file to write the JSON results to [stdout]")
+    options, args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in options.sizes.split(',')]
+    names = [name for name in options.views.split(',') if name]
+    scenarios = [s for s in SCENARIOS if not names or s[0] in names]
+
+    connection.creation.create_test_db(verbosity=0)
+    results = []
+    for size in sizes:
+        seed(size)
+        for scenario in scenarios:
+            result = run_scenario(scenario, options.requests, options.min_requests,
+                                  options.max_seconds)
+            result['dataset'] = size
+            results.append(result)
+            sys.stderr.write('%(dataset)s %(view)s: %(req_per_sec)s req/s, '
+                             'p50 %(p50_ms)sms, p99 %(p99_ms)sms, '
+                             '%(queries_per_request)s queries\n' % result)
+
+    output = simplejson.dumps({
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.settings_dict['ENGINE'],
+        'results': results,
+    }, indent=2, sort_keys=True)
+    if options.output:
+        f = open(options.output, 'w')
+        try:
+            f.write(output)
+        finally:
+            f.close()
+    else:
+        print output
+
+if __name__ == '__main__':
+    main()
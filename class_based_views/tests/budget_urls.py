@@ -0,0 +1,9 @@
+import views
+from django.conf.urls.defaults import *
+
+# A view over its query budget that only logs, for testing
+# testing.assert_query_budgets().
+urlpatterns = patterns('',
+    (r'^detail/author/(?P<pk>\d+)/$',
+        views.AuthorDetail.as_view(max_queries=0, query_budget_action='log')),
+)
@@ -1,4 +1,5 @@
 from django import forms
+from django.forms.models import modelformset_factory
 from models import Author
 
 class AuthorForm(forms.ModelForm):
@@ -7,3 +8,5 @@ class AuthorForm(forms.ModelForm):
     
     class Meta:
         model = Author
+
+AuthorFormSet = modelformset_factory(Author, form=AuthorForm, extra=0)
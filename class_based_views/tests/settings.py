@@ -1,4 +1,10 @@
+import os
+import tempfile
+
 DATABASE_ENGINE = 'sqlite3'
+# A file rather than the default in-memory database, so that tests can check
+# what other threads and connections see.
+TEST_DATABASE_NAME = os.path.join(tempfile.gettempdir(), 'class_based_views_test.db')
 ROOT_URLCONF = 'class_based_views.tests.urls'
 INSTALLED_APPS = [
     'django.contrib.auth',
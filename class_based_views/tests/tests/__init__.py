@@ -1,5 +1,5 @@
-from class_based_views.tests.tests.base import ViewTest, TemplateViewTest
-from class_based_views.tests.tests.dates import ArchiveViewTests, YearViewTests, MonthViewTests, WeekViewTests, DayViewTests, DateDetailViewTests
+from class_based_views.tests.tests.base import ViewTest, TemplateViewTest, InstrumentationTest, QueryBudgetTest
+from class_based_views.tests.tests.dates import ArchiveViewTests, YearViewTests, MonthViewTests, MonthViewParallelTests, WeekViewTests, DayViewTests, DateDetailViewTests
 from class_based_views.tests.tests.detail import DetailViewTest
 from class_based_views.tests.tests.edit import EditViewTests
-from class_based_views.tests.tests.list import ListViewTests
\ No newline at end of file
+from class_based_views.tests.tests.list import ListViewTests, ListViewStreamTests
\ No newline at end of file
@@ -1,9 +1,17 @@
-from class_based_views.base import View, TemplateView
+from class_based_views import base
+from class_based_views.base import QueryBudgetExceeded, View, TemplateView
+from class_based_views.instrumentation import LoggingSink, MemorySink, StatsdSink
+from class_based_views.testing import assert_query_budgets
+from class_based_views.tests.views import AuthorDetail
+from django.conf import settings
 from class_based_views.tests.utils import RequestFactory
 from django.core.exceptions import ImproperlyConfigured
 from django.http import HttpResponse
 from django.test import TestCase
 from django.utils import simplejson
+import logging
+import socket
+import threading
 import unittest
 
 class SimpleView(View):
@@ -58,6 +66,16 @@ class ViewTest(unittest.TestCase):
             self.rf.get('/', REQUEST_METHOD='FAKE')
         ).status_code, 405)
     
+    def test_not_allowed_lists_allowed_methods(self):
+        """
+        Test a 405 response lists the methods the view does allow, and that
+        a subclass doesn't reuse its parent's handlers.
+        """
+        response = SimpleView.as_view()(self.rf.post('/'))
+        self.assertEqual(response['Allow'], 'GET')
+        response = SimplePostView.as_view()(self.rf.put('/'))
+        self.assertEqual(response['Allow'], 'GET, POST')
+
     def test_calling_more_than_once(self):
         """
         Test a view can only be called once.
@@ -66,6 +84,40 @@ class ViewTest(unittest.TestCase):
         view = InstanceView.as_view()
         self.assertNotEqual(view(request), view(request))
     
+    def test_keyword_argument_setter(self):
+        """
+        Test that keyword arguments naming a property go through its setter.
+        """
+        class PropertyView(InstanceView):
+            def _get_greeting(self):
+                return self._greeting
+            def _set_greeting(self, value):
+                self._greeting = value.upper()
+            greeting = property(_get_greeting, _set_greeting)
+        view = PropertyView.as_view(greeting='hello')(self.rf.get('/'))
+        self.assertEqual(view.greeting, 'HELLO')
+    
+    def test_invalid_keyword_argument(self):
+        """
+        Test that invalid keyword arguments are rejected as soon as the view
+        is created, rather than on the first request.
+        """
+        self.assertRaises(TypeError, SimpleView.as_view, foo='bar')
+        self.assertRaises(TypeError, SimpleView.as_view, GET='bar')
+    
+    def test_keyword_arguments_set_on_instance(self):
+        """
+        Test that keyword arguments end up on each instance without being
+        shared between them.
+        """
+        request = self.rf.get('/')
+        view = InstanceView.as_view(method_names=['GET'])
+        first, second = view(request), view(request)
+        self.assertEqual(first.method_names, ['GET'])
+        self.assertEqual(first.request, request)
+        first.extra = 'foo'
+        self.assertFalse(hasattr(second, 'extra'))
+    
 
 class TemplateViewTest(unittest.TestCase):
     rf = RequestFactory()
@@ -87,3 +139,224 @@ class TemplateViewTest(unittest.TestCase):
         """
         self._assert_about(AboutTemplateAttributeView.as_view()(self.rf.get('/about/')))
     
+    def test_template_cache(self):
+        """
+        Test that compiled templates are cached by the list of names they
+        were selected from, unless caching is turned off.
+        """
+        base.clear_template_cache()
+        AboutTemplateAttributeView.as_view(cache_templates=False)(self.rf.get('/about/'))
+        self.assertEqual(base._template_cache, {})
+        self._assert_about(AboutTemplateAttributeView.as_view()(self.rf.get('/about/')))
+        template = base._template_cache[('tests/about.html',)]
+        self._assert_about(AboutTemplateAttributeView.as_view()(self.rf.get('/about/')))
+        self.assertTrue(base._template_cache[('tests/about.html',)] is template)
+        base.clear_template_cache()
+        self.assertEqual(base._template_cache, {})
+    
+    def test_template_cache_parents(self):
+        """
+        Test that the parent of a cached template is loaded once rather than
+        on every render.
+        """
+        base.clear_template_cache()
+        view = TemplateView(template_name='tests/stream_list.html')
+        template = view.get_template()
+        extends = template.nodelist[0]
+        self.assertEqual(extends.parent_name.name, 'tests/stream_base.html')
+        base.clear_template_cache()
+    
+    def test_resolve_context(self):
+        """
+        Test that context providers are resolved one after another by
+        default, leaving those in ``lazy_context`` until they're used, and in
+        the thread pool if ``parallel_context`` is set.
+        """
+        calls = []
+        def current_thread():
+            calls.append(1)
+            return threading.currentThread()
+        providers = {'a': current_thread, 'b': current_thread}
+        view = AboutTemplateView()
+        results = view.resolve_context(providers)
+        self.assertEqual(results['a'], threading.currentThread())
+        self.assertEqual(results['b'], threading.currentThread())
+        
+        calls = []
+        view = AboutTemplateView(lazy_context=['b'])
+        results = view.resolve_context(providers)
+        self.assertEqual(len(calls), 1)
+        copied = results.copy()
+        self.assertTrue(results['b'] is threading.currentThread())
+        self.assertEqual(len(calls), 2)
+        results['b']
+        self.assertEqual(len(calls), 2)
+        # Copies keep the entry pending.
+        self.assertTrue(copied.pop('b') is threading.currentThread())
+        self.assertEqual(len(calls), 3)
+        
+        # These providers don't use the database, so whether the pool's
+        # threads could share it is only pretended.
+        old_has_memory_database = base._has_memory_database
+        base._has_memory_database = lambda: False
+        try:
+            view = AboutTemplateView(parallel_context=True, lazy_context=['b'])
+            results = view.resolve_context(providers)
+            self.assertNotEqual(results['a'], results['b'])
+            pool = base._get_context_pool(view.get_context_threads())
+            workers = set(pool.threads)
+            view.resolve_context(providers)
+            self.assertEqual(set(pool.threads), workers)
+            self.assertEqual(len(workers), 4)
+            
+            # Views can ask for a pool of another size.
+            view = AboutTemplateView(parallel_context=True, context_threads=1)
+            results = view.resolve_context(providers)
+            self.assertNotEqual(results['a'], results['b'])
+            self.assertEqual(len(base._get_context_pool(1).threads), 1)
+            
+            def fail():
+                raise ValueError('provider failed')
+            providers['b'] = fail
+            self.assertRaises(ValueError, view.resolve_context, providers)
+            
+            # An in-memory database can't be shared with the pool.
+            base._has_memory_database = lambda: True
+            view = AboutTemplateView(parallel_context=True)
+            providers['b'] = current_thread
+            results = view.resolve_context(providers)
+            self.assertEqual(results['b'], threading.currentThread())
+        finally:
+            base._has_memory_database = old_has_memory_database
+    
+    def test_context_providers(self):
+        """
+        Test that providers declared in ``context_providers`` call the view's
+        ``provide_<name>()`` methods.
+        """
+        class ProvidingView(TemplateView):
+            context_providers = ('answer',)
+            def provide_answer(self, offset):
+                return 40 + offset
+        providers = ProvidingView().get_context_providers(offset=2)
+        self.assertEqual(providers.keys(), ['answer'])
+        self.assertEqual(providers['answer'](), 42)
+
+
+class ListSink(object):
+    def __init__(self):
+        self.records = []
+    
+    def record(self, view, spans):
+        self.records.append((view, spans))
+    
+
+class InstrumentationTest(unittest.TestCase):
+    rf = RequestFactory()
+    
+    def test_disabled(self):
+        """
+        Test that views without sinks aren't instrumented at all.
+        """
+        view = InstanceView.as_view()(self.rf.get('/'))
+        self.assertFalse('dispatch' in view.__dict__)
+    
+    def test_spans(self):
+        """
+        Test that each stage of a request is timed and passed to the sinks.
+        """
+        sink, memory = ListSink(), MemorySink()
+        view = AboutTemplateAttributeView.as_view(instrumentation_sinks=[sink, memory])
+        response = view(self.rf.get('/about/'))
+        self.assertEqual(response.content, '<h1>About</h1>')
+        self.assertEqual(len(sink.records), 1)
+        instance, spans = sink.records[0]
+        stages = [stage for stage, seconds, queries in spans]
+        self.assertEqual(stages, ['get_template_names', 'load_template', 'render',
+                                  'get_response', 'dispatch'])
+        for stage, seconds, queries in spans:
+            self.assert_(seconds >= 0)
+        
+        view(self.rf.get('/about/'))
+        name = 'class_based_views.tests.tests.base.AboutTemplateAttributeView'
+        self.assertEqual(memory.histograms[(name, 'dispatch')]['count'], 2)
+        self.assertEqual(sum(memory.histograms[(name, 'render')]['buckets']), 2)
+    
+    def test_logging_and_statsd_sinks(self):
+        """
+        Test the logging and statsd sinks, and that a failing sink doesn't
+        break the request.
+        """
+        collector = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        collector.bind(('127.0.0.1', 0))
+        collector.settimeout(5)
+        statsd = StatsdSink(port=collector.getsockname()[1], prefix='test')
+        
+        class BrokenSink(object):
+            def record(self, view, spans):
+                raise ValueError
+        
+        logger = logging.getLogger('class_based_views.instrumentation')
+        old_disabled, logger.disabled = logger.disabled, True
+        try:
+            view = SimpleView.as_view(instrumentation_sinks=[
+                LoggingSink(), BrokenSink(), statsd])
+            self.assertEqual(view(self.rf.get('/')).status_code, 200)
+        finally:
+            logger.disabled = old_disabled
+        packet = collector.recv(4096)
+        collector.close()
+        self.assert_(packet.startswith(
+            'test.class_based_views.tests.tests.base.SimpleView.dispatch:'), packet)
+        self.assert_(packet.split('\n')[0].endswith('|ms'), packet)
+
+
+class QueryBudgetTest(TestCase):
+    fixtures = ['generic-views-test-data.json']
+    urls = 'class_based_views.tests.urls'
+    rf = RequestFactory()
+    
+    def test_budget(self):
+        """
+        Test that a view going over its query budget raises an error in
+        debug mode, or logs one if asked to.
+        """
+        request = self.rf.get('/')
+        view = AuthorDetail.as_view(max_queries=0)
+        self.assertEqual(view(request, pk='1').status_code, 200)
+        old_debug, settings.DEBUG = settings.DEBUG, True
+        logger = logging.getLogger('class_based_views')
+        old_disabled, logger.disabled = logger.disabled, True
+        try:
+            self.assertRaises(QueryBudgetExceeded, view, request, pk='1')
+            view = AuthorDetail.as_view(max_queries=0, query_budget_action='log')
+            self.assertEqual(view(request, pk='1').status_code, 200)
+            self.assertEqual(AuthorDetail.as_view(max_queries=1)(request, pk='1').status_code, 200)
+        finally:
+            settings.DEBUG = old_debug
+            logger.disabled = old_disabled
+    
+    def test_assert_query_budgets(self):
+        """
+        Test the URLconf helper.
+        """
+        assert_query_budgets(['/detail/author/1/', '/edit/author/1/update/',
+                              '/dates/books/2008/oct/', '/dates/books/2008/oct/1/'],
+                             urlconf=self.urls)
+        self.assertRaises(AssertionError, assert_query_budgets, ['/detail/author/1/'],
+                          urlconf=self.urls)
+        
+        # Views that fail are caught...
+        self.assertRaises(AssertionError, assert_query_budgets,
+                          ['/detail/author/999/', '/edit/author/1/update/',
+                           '/dates/books/2008/oct/', '/dates/books/2008/oct/1/'],
+                          urlconf=self.urls)
+        # ...as are views over their budget that only log it.
+        logger = logging.getLogger('class_based_views')
+        old_disabled, logger.disabled = logger.disabled, True
+        try:
+            self.assertRaises(AssertionError, assert_query_budgets, ['/detail/author/1/'],
+                              urlconf='class_based_views.tests.budget_urls')
+        finally:
+            logger.disabled = old_disabled
+    
@@ -1,7 +1,16 @@
 import datetime
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
-from django.test import TestCase
+from django.db import connection, models
+from django.http import Http404
+from django.test import TestCase, TransactionTestCase
+from class_based_views import base
+from class_based_views.base import QueryBudgetExceeded
+from class_based_views.dates import _date_from_string, _date_range_lookup
 from class_based_views.tests.models import Book
+from class_based_views.tests.utils import RequestFactory
+from class_based_views.tests.views import BookMonthArchive, BookMonthArchiveWithCount
 
 class ArchiveViewTests(TestCase):
     fixtures = ['generic-views-test-data.json']
@@ -14,6 +23,82 @@ class ArchiveViewTests(TestCase):
         self.assertEqual(list(res.context['latest']), list(Book.objects.all()))
         self.assertTemplateUsed(res, 'tests/book_archive.html')
 
+    def test_archive_view_rows(self):
+        res = self.client.get('/dates/books/rows/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(res.context['latest']), list(Book.objects.values('name', 'pubdate')))
+        self.assertTemplateUsed(res, 'tests/book_archive.html')
+
+    def test_archive_view_last_modified(self):
+        res = self.client.get('/dates/books/last_modified/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Last-Modified'], 'Wed, 01 Oct 2008 00:00:00 GMT')
+
+        res = self.client.get('/dates/books/last_modified/',
+                              HTTP_IF_MODIFIED_SINCE='Wed, 01 Oct 2008 00:00:00 GMT')
+        self.assertEqual(res.status_code, 304)
+
+        res = self.client.get('/dates/books/last_modified/',
+                              HTTP_IF_MODIFIED_SINCE='Tue, 30 Sep 2008 00:00:00 GMT')
+        self.assertEqual(res.status_code, 200)
+        self.assertTemplateUsed(res, 'tests/book_archive.html')
+
+    def test_archive_view_last_modified_date_list(self):
+        # Without any latest items, the date list is still covered.
+        res = self.client.get('/dates/books/last_modified/no_latest/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['latest'], None)
+        self.assertEqual(res['Last-Modified'], 'Wed, 01 Oct 2008 00:00:00 GMT')
+
+    def test_archive_view_date_index(self):
+        cache.clear()
+        res = self.client.get('/dates/books/indexed/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['date_list'], Book.objects.dates('pubdate', 'year')[::-1])
+        self.assertEqual(res.context['date_counts'], {
+            datetime.datetime(2008, 1, 1): 1,
+            datetime.datetime(2006, 1, 1): 1,
+        })
+
+        # The index follows saves and deletes without being rebuilt.
+        b = Book.objects.create(name="Savage Detectives", pages=600, pubdate=datetime.date(2007, 2, 1))
+        res = self.client.get('/dates/books/indexed/')
+        self.assertEqual(res.context['date_list'], Book.objects.dates('pubdate', 'year')[::-1])
+        b.pubdate = datetime.date(2008, 2, 1)
+        b.save()
+        res = self.client.get('/dates/books/indexed/')
+        self.assertEqual(res.context['date_list'], Book.objects.dates('pubdate', 'year')[::-1])
+        self.assertEqual(res.context['date_counts'][datetime.datetime(2008, 1, 1)], 2)
+        b.delete()
+        Book.objects.get(pk=2).delete()
+        res = self.client.get('/dates/books/indexed/')
+        self.assertEqual(res.context['date_list'], [datetime.datetime(2008, 1, 1)])
+        self.assertEqual(res.context['date_counts'], {datetime.datetime(2008, 1, 1): 1})
+
+        # Only updates read the stored date back; creating an object doesn't.
+        old_debug, settings.DEBUG = settings.DEBUG, True
+        connection.queries = []
+        try:
+            b = Book.objects.create(name="2066", pages=900, pubdate=datetime.date(2004, 1, 1))
+            self.assertEqual(len(connection.queries), 1)
+            connection.queries = []
+            b.pubdate = datetime.date(2005, 1, 1)
+            b.save()
+            self.assertEqual(len(connection.queries), 3)
+        finally:
+            settings.DEBUG = old_debug
+        res = self.client.get('/dates/books/indexed/')
+        self.assertEqual(res.context['date_counts'], {
+            datetime.datetime(2008, 1, 1): 1, datetime.datetime(2005, 1, 1): 1})
+        b.delete()
+
+        # Future objects are left out unless allow_future is set.
+        Book.objects.create(name="The New New Testement", pages=600,
+                            pubdate=datetime.date(datetime.date.today().year + 1, 1, 1))
+        res = self.client.get('/dates/books/indexed/')
+        self.assertEqual(res.context['date_list'], [datetime.datetime(2008, 1, 1)])
+        cache.clear()
+
     def test_archive_view_invalid(self):
         self.assertRaises(ImproperlyConfigured, self.client.get, '/dates/books/invalid/')
 
@@ -28,6 +113,15 @@ class YearViewTests(TestCase):
         self.assertEqual(res.context['year'], 2008)
         self.assertTemplateUsed(res, 'tests/book_archive_year.html')
 
+    def test_year_view_last_modified(self):
+        res = self.client.get('/dates/books/2006/last_modified/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(res.context['object_list']), [])
+        self.assertEqual(res['Last-Modified'], 'Mon, 01 May 2006 00:00:00 GMT')
+        res = self.client.get('/dates/books/2006/last_modified/',
+                              HTTP_IF_MODIFIED_SINCE='Mon, 01 May 2006 00:00:00 GMT')
+        self.assertEqual(res.status_code, 304)
+
     def test_year_view_make_object_list(self):
         res = self.client.get('/dates/books/2006/make_object_list/')
         self.assertEqual(res.status_code, 200)
@@ -59,6 +153,29 @@ class YearViewTests(TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertEqual(list(res.context['date_list']), [datetime.datetime(year, 1, 1)])
 
+    def test_year_view_date_index(self):
+        cache.clear()
+        Book.objects.create(name="Savage Detectives", pages=600, pubdate=datetime.date(2008, 2, 1))
+        res = self.client.get('/dates/books/2008/indexed/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(res.context['date_list']),
+                         [datetime.datetime(2008, 10, 1), datetime.datetime(2008, 2, 1)])
+        res = self.client.get('/dates/books/1999/indexed/')
+        self.assertEqual(res.status_code, 404)
+        cache.clear()
+
+    def test_year_view_range_lookup(self):
+        Book.objects.create(name="Savage Detectives", pages=600, pubdate=datetime.date(2009, 1, 1))
+        res = self.client.get('/dates/books/2008/make_object_list/')
+        self.assertEqual(list(res.context['books']), [Book.objects.get(pubdate=datetime.date(2008, 10, 1))])
+
+        lookup = _date_range_lookup(models.DateTimeField(name='updated'),
+                                    datetime.date(2008, 1, 1), datetime.date(2009, 1, 1))
+        self.assertEqual(lookup, {
+            'updated__gte': datetime.datetime(2008, 1, 1),
+            'updated__lt': datetime.datetime(2009, 1, 1),
+        })
+
     def test_year_view_invalid_pattern(self):
         self.assertRaises(TypeError, self.client.get, '/dates/books/no_year/')
 
@@ -129,6 +246,63 @@ class MonthViewTests(TestCase):
         self.assertEqual(res.context['next_month'], future)
         self.assertEqual(res.context['previous_month'], datetime.date(2006, 5, 1))
 
+    def test_month_view_date_index(self):
+        cache.clear()
+        Book.objects.create(name="Savage Detectives", pages=600, pubdate=datetime.date(2008, 10, 3))
+        Book.objects.create(name="Nazi Literature", pages=600, pubdate=datetime.date(2008, 10, 3))
+        res = self.client.get('/dates/books/2008/oct/indexed/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(res.context['date_list']),
+                         [datetime.datetime(2008, 10, 3), datetime.datetime(2008, 10, 1)])
+        self.assertEqual(res.context['date_counts'], {
+            datetime.datetime(2008, 10, 3): 2,
+            datetime.datetime(2008, 10, 1): 1,
+        })
+        cache.clear()
+
+    def test_next_prev_month_single_query(self):
+        view = BookMonthArchive()
+        old_debug, settings.DEBUG = settings.DEBUG, True
+        connection.queries = []
+        try:
+            self.assertEqual(view.get_next_month(datetime.date(2008, 10, 1)), None)
+            self.assertEqual(view.get_previous_month(datetime.date(2008, 10, 1)),
+                             datetime.date(2006, 5, 1))
+            self.assertEqual(len(connection.queries), 1)
+        finally:
+            settings.DEBUG = old_debug
+
+    def test_next_prev_month_lazy(self):
+        old_debug, settings.DEBUG = settings.DEBUG, True
+        connection.queries = []
+        try:
+            res = self.client.get('/dates/books/2008/oct/')
+            self.assertEqual(res.status_code, 200)
+            # The template doesn't show the neighbouring months...
+            self.assertEqual(len(connection.queries), 2)
+            # ...which are looked up, together, when they're first used.
+            self.assertEqual(res.context['previous_month'], datetime.date(2006, 5, 1))
+            self.assertEqual(res.context['next_month'], None)
+            self.assertEqual(len(connection.queries), 3)
+            self.assertFalse(res.context['next_month'])
+            self.assertEqual(len(connection.queries), 3)
+        finally:
+            settings.DEBUG = old_debug
+
+    def test_next_prev_month_values(self):
+        # Looking the neighbouring months up gives the values themselves.
+        res = self.client.get('/dates/books/2008/oct/')
+        self.assertTrue(res.context['next_month'] is None)
+        self.assertEqual(res.context['previous_month'] + datetime.timedelta(days=1),
+                         datetime.date(2006, 5, 2))
+        self.assertEqual(datetime.date(2006, 6, 1) - res.context['previous_month'],
+                         datetime.timedelta(days=31))
+
+        date_list, items, context = BookMonthArchive().get_dated_items('2008', 'oct')
+        self.assertTrue(context['next_month'] is None)
+        self.assertTrue(context.get('previous_month') == datetime.date(2006, 5, 1))
+        self.assertEqual(dict(context.items())['previous_month'], datetime.date(2006, 5, 1))
+
     def test_custom_month_format(self):
         res = self.client.get('/dates/books/2008/10/')
         self.assertEqual(res.status_code, 200)
@@ -136,6 +310,40 @@ class MonthViewTests(TestCase):
     def test_month_view_invalid_pattern(self):
         self.assertRaises(TypeError, self.client.get, '/dates/books/2007/no_month/')
 
+class MonthViewParallelTests(TransactionTestCase):
+    # Threads can only share a committed, file-backed test database; with an
+    # in-memory SQLite database the providers are resolved one at a time.
+    fixtures = ['generic-views-test-data.json']
+    urls = 'class_based_views.tests.urls'
+
+    def test_parallel_context(self):
+        res = self.client.get('/dates/books/2008/oct/parallel/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(res.context['date_list']), [datetime.datetime(2008, 10, 1)])
+        self.assertEqual(res.context['next_month'], None)
+        self.assertEqual(res.context['previous_month'], datetime.date(2006, 5, 1))
+        res = self.client.get('/dates/books/2000/jan/parallel/')
+        self.assertEqual(res.status_code, 404)
+
+    def test_parallel_context_queries(self):
+        # Queries run by the worker threads are counted as the request's own.
+        old_debug, settings.DEBUG = settings.DEBUG, True
+        try:
+            res = self.client.get('/dates/books/2008/oct/parallel/count/')
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.context['book_count'], 2)
+            self.assertEqual(len(base._get_context_pool(2).threads), 2)
+            parallel = len(connection.queries)
+            connection.queries = []
+            BookMonthArchiveWithCount.as_view()(RequestFactory().get('/'), year='2008', month='oct')
+            self.assertEqual(parallel, len(connection.queries))
+            view = BookMonthArchiveWithCount.as_view(parallel_context=True,
+                                                     max_queries=parallel - 1)
+            self.assertRaises(QueryBudgetExceeded, view, RequestFactory().get('/'),
+                              year='2008', month='oct')
+        finally:
+            settings.DEBUG = old_debug
+
 class WeekViewTests(TestCase):
     fixtures = ['generic-views-test-data.json']
     urls = 'class_based_views.tests.urls'
@@ -184,6 +392,9 @@ class DayViewTests(TestCase):
         # Since allow_empty=False, next/prev days must be valid.
         self.assertEqual(res.context['next_day'], None)
         self.assertEqual(res.context['previous_day'], datetime.date(2006, 5, 1))
+        self.assertTrue(res.context['next_day'] is None)
+        self.assertEqual(res.context['previous_day'] - datetime.timedelta(days=1),
+                         datetime.date(2006, 4, 30))
 
     def test_day_view_allow_empty(self):
         # allow_empty = False, empty month
@@ -242,6 +453,23 @@ class DayViewTests(TestCase):
     def test_day_view_invalid_pattern(self):
         self.assertRaises(TypeError, self.client.get, '/dates/books/2007/oct/no_day/')
 
+    def test_date_from_string(self):
+        self.assertEqual(_date_from_string(u'2008', '%Y', u'oct', '%b', u'01', '%d'),
+                         datetime.date(2008, 10, 1))
+        self.assertEqual(_date_from_string(u'2008', '%Y', u'OCT', '%b', u'1', '%d'),
+                         datetime.date(2008, 10, 1))
+        self.assertEqual(_date_from_string(u'2008', '%Y', u'10', '%m'),
+                         datetime.date(2008, 10, 1))
+        self.assertEqual(_date_from_string(u'2008', '%Y', '0', '%w', u'39', '%U'),
+                         datetime.date(2008, 9, 28))
+        for args in [(u'2008', '%Y', u'oct', '%m'),
+                     (u'2008', '%Y', u'feb', '%b', u'30', '%d'),
+                     (u'2008', '%Y', u'10', '%m', u'001', '%d'),
+                     (u'2008', '%Y', u'oct', '%b', u'01\n', '%d')]:
+            self.assertRaises(Http404, _date_from_string, *args)
+            # Invalid dates aren't cached.
+            self.assertRaises(Http404, _date_from_string, *args)
+
     def test_today_view(self):
         res = self.client.get('/dates/books/today/')
         self.assertEqual(res.status_code, 404)
@@ -1,6 +1,14 @@
-from class_based_views.tests.models import Author
+from class_based_views import detail
+from class_based_views.tests.models import Author, Book
+from class_based_views.tests.views import AuthorDetail, PlainBookDetail
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
 from django.test import TestCase
+from django.utils import simplejson
 
 class DetailViewTest(TestCase):
     fixtures = ['generic-views-test-data.json']
@@ -26,6 +34,183 @@ class DetailViewTest(TestCase):
         self.assertEqual(res.context['author'], Author.objects.get(slug='scott-rosenberg'))
         self.assertTemplateUsed(res, 'tests/author_detail.html')
 
+    def test_prefetch_related(self):
+        res = self.client.get('/detail/book/1/prefetched/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['book'].prefetched_authors,
+                         [Author.objects.get(pk=1)])
+        res = self.client.get('/detail/book/2/prefetched/')
+        self.assertEqual(res.context['book'].prefetched_authors, [])
+
+    def test_etag(self):
+        res = self.client.get('/detail/author/1/etag/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['ETag'], '"1-roberto-bolano"')
+
+        res = self.client.get('/detail/author/1/etag/', HTTP_IF_NONE_MATCH='"1-roberto-bolano"')
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, '')
+        self.assertEqual(res.template, None)
+
+        res = self.client.get('/detail/author/1/etag/', HTTP_IF_NONE_MATCH='"1-someone-else"')
+        self.assertEqual(res.status_code, 200)
+        self.assertTemplateUsed(res, 'tests/author_detail.html')
+
+    def test_cached_response_etag(self):
+        cache.clear()
+        res = self.client.get('/detail/author/1/etag/cached/')
+        self.assertEqual(res.status_code, 200)
+        self.assertTemplateUsed(res, 'tests/author_detail.html')
+        content = res.content
+
+        # Cache hits keep the headers and still answer conditional requests.
+        res = self.client.get('/detail/author/1/etag/cached/')
+        self.assertEqual(res.template, None)
+        self.assertEqual(res.content, content)
+        self.assertEqual(res['ETag'], '"1-roberto-bolano"')
+        res = self.client.get('/detail/author/1/etag/cached/',
+                              HTTP_IF_NONE_MATCH='"1-roberto-bolano"')
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, '')
+        self.assertEqual(res['ETag'], '"1-roberto-bolano"')
+        cache.clear()
+
+    def test_fragment_cache(self):
+        cache.clear()
+        res = self.client.get('/detail/author/2/cached/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, 'This is an Scott Rosenberg.')
+
+        # Changes that don't go through the edit views aren't seen...
+        Author.objects.filter(pk=2).update(name='Someone Else')
+        res = self.client.get('/detail/author/2/cached/')
+        self.assertEqual(res.content, 'This is an Scott Rosenberg.')
+        self.assertEqual(res.template, None)
+
+        # ...but updating the object with UpdateView invalidates the cache.
+        res = self.client.post('/edit/author/2/update/',
+                               {'name': 'Scott Rosenberg (author)', 'slug': 'scott-rosenberg'})
+        self.assertEqual(res.status_code, 302)
+        res = self.client.get('/detail/author/2/cached/')
+        self.assertEqual(res.content, 'This is an Scott Rosenberg (author).')
+
+        res = self.client.post('/edit/author/2/delete/')
+        self.assertEqual(res.status_code, 302)
+        res = self.client.get('/detail/author/2/cached/')
+        self.assertEqual(res.status_code, 404)
+        cache.clear()
+
+    def test_invalidate_on_change(self):
+        # Start from a process where no view has hooked up Book yet.
+        uid = 'class_based_views.detail.%s' % Book._meta
+        post_save.disconnect(sender=Book, dispatch_uid=uid)
+        post_delete.disconnect(sender=Book, dispatch_uid=uid)
+        detail._invalidated_models.discard(Book)
+        cache.clear()
+
+        book = Book.objects.get(pk=1)
+        generation = detail._get_generation(Book._meta, book.pk)
+        book.save()
+        self.assertEqual(detail._get_generation(Book._meta, book.pk), generation)
+
+        # Creating a caching view is enough, without serving a request.
+        PlainBookDetail.as_view(cache_objects=True)
+        book.save()
+        self.assertNotEqual(detail._get_generation(Book._meta, book.pk), generation)
+        cache.clear()
+
+    def test_fragment_cache_per_view(self):
+        class OtherAuthorDetail(AuthorDetail):
+            def get_context(self, obj):
+                return {'author': 'someone else'}
+        obj = Author.objects.get(pk=1)
+        template_names = AuthorDetail().get_template_names(obj)
+        self.assertNotEqual(
+            AuthorDetail().get_fragment_cache_key(obj, template_names),
+            OtherAuthorDetail().get_fragment_cache_key(obj, template_names))
+
+    def test_json(self):
+        res = self.client.get('/detail/author/2/json/', {'format': 'json'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(simplejson.loads(res.content), {'id': 2, 'name': 'Scott Rosenberg'})
+        res = self.client.get('/detail/author/2/json/')
+        self.assertTemplateUsed(res, 'tests/author_detail.html')
+        self.assertEqual(res['Vary'], 'Accept')
+
+    def test_json_etag(self):
+        res = self.client.get('/detail/author/1/etag/json/')
+        self.assertEqual(res['ETag'], '"1-roberto-bolano"')
+        res = self.client.get('/detail/author/1/etag/json/', HTTP_ACCEPT='application/json')
+        self.assertEqual(res['ETag'], '"1-roberto-bolano;json"')
+        self.assertEqual(res['Vary'], 'Accept')
+
+        # The HTML's ETag doesn't validate the JSON, nor the other way round.
+        res = self.client.get('/detail/author/1/etag/json/', HTTP_ACCEPT='application/json',
+                              HTTP_IF_NONE_MATCH='"1-roberto-bolano"')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        res = self.client.get('/detail/author/1/etag/json/',
+                              HTTP_IF_NONE_MATCH='"1-roberto-bolano;json"')
+        self.assertEqual(res.status_code, 200)
+        self.assertTemplateUsed(res, 'tests/author_detail.html')
+        res = self.client.get('/detail/author/1/etag/json/', HTTP_ACCEPT='application/json',
+                              HTTP_IF_NONE_MATCH='"1-roberto-bolano;json"')
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['Vary'], 'Accept')
+
+    def _count_queries(self, func, *args, **kwargs):
+        old_debug, settings.DEBUG = settings.DEBUG, True
+        connection.queries = []
+        try:
+            result = func(*args, **kwargs)
+            return result, len(connection.queries)
+        finally:
+            settings.DEBUG = old_debug
+
+    def test_get_object_once_per_request(self):
+        view = AuthorDetail()
+        obj, queries = self._count_queries(view.get_object, pk='1')
+        self.assertEqual(queries, 1)
+        self.assertEqual(self._count_queries(view.get_object, pk='1'), (obj, 0))
+
+    def test_object_cache(self):
+        cache.clear()
+        obj, queries = self._count_queries(AuthorDetail(cache_objects=True).get_object, pk='1')
+        self.assertEqual((obj, queries), (Author.objects.get(pk=1), 1))
+        obj, queries = self._count_queries(AuthorDetail(cache_objects=True).get_object, pk='1')
+        self.assertEqual((obj.name, queries), (u'Roberto Bola\xf1o', 0))
+
+        obj.name = 'Someone Else'
+        obj.save()
+        obj, queries = self._count_queries(AuthorDetail(cache_objects=True).get_object, pk='1')
+        self.assertEqual((obj.name, queries), ('Someone Else', 1))
+
+        get_by_slug = lambda slug: AuthorDetail(cache_objects=True).get_object(slug=slug)
+        obj, queries = self._count_queries(get_by_slug, 'scott-rosenberg')
+        self.assertEqual((obj.pk, queries), (2, 1))
+        obj, queries = self._count_queries(get_by_slug, 'scott-rosenberg')
+        self.assertEqual((obj.pk, queries), (2, 0))
+        obj.slug = 'scott'
+        obj.save()
+        self.assertRaises(Http404, get_by_slug, 'scott-rosenberg')
+        self.assertEqual(get_by_slug('scott').pk, 2)
+        cache.clear()
+
+    def test_object_cache_related(self):
+        # Related objects are fetched afresh rather than cached with the
+        # object, since changing them doesn't invalidate it.
+        cache.clear()
+        get_book = lambda: PlainBookDetail(
+            cache_objects=True, prefetch_related=['authors'], select_related=True).get_object(pk='1')
+        self.assertEqual([a.name for a in get_book().prefetched_authors], [u'Roberto Bola\xf1o'])
+        author = Author.objects.get(pk=1)
+        author.name = 'Someone Else'
+        author.save()
+        obj, queries = self._count_queries(get_book)
+        self.assertEqual(([a.name for a in obj.prefetched_authors], queries), (['Someone Else'], 1))
+        cache.clear()
+
     def test_invalid_url(self):
         self.assertRaises(AttributeError, self.client.get, '/detail/author/invalid/url/')
 
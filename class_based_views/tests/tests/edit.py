@@ -1,4 +1,5 @@
 from class_based_views.tests.models import Author
+from django.core.cache import cache
 from django.test import TestCase
 
 class EditViewTests(TestCase):
@@ -70,6 +71,62 @@ class EditViewTests(TestCase):
         self.assertEqual(len(res.context['form'].errors), 1)
         self.assertEqual(str(Author.objects.all()), "[<Author: Randall Munroe>]")
     
+    def test_bulk_create(self):
+        res = self.client.get('/edit/authors/bulk/create/')
+        self.assertEqual(res.status_code, 200)
+        self.assertTemplateUsed(res, 'tests/list.html')
+        self.assertEqual(len(res.context['formset'].forms), 0)
+
+        data = self._formset_data([
+            {'name': 'Randall Munroe', 'slug': 'randall-munroe'},
+            {'name': 'Scott Rosenberg', 'slug': 'scott-rosenberg'},
+        ])
+        res = self.client.post('/edit/authors/bulk/create/', data)
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(str(Author.objects.all()),
+                         "[<Author: Randall Munroe>, <Author: Scott Rosenberg>]")
+
+    def test_bulk_create_invalid(self):
+        data = self._formset_data([
+            {'name': 'Randall Munroe', 'slug': 'randall-munroe'},
+            {'name': 'A' * 101, 'slug': 'scott-rosenberg'},
+        ])
+        res = self.client.post('/edit/authors/bulk/create/', data)
+        self.assertEqual(res.status_code, 200)
+        self.assertTemplateUsed(res, 'tests/list.html')
+        self.assertEqual(len(res.context['formset'].forms[1].errors), 1)
+        self.assertEqual(Author.objects.count(), 0)
+
+    def test_bulk_update(self):
+        a = Author.objects.create(name='Randall Munroe', slug='randall-munroe')
+        b = Author.objects.create(name='Scott Rosenberg', slug='scott-rosenberg')
+        res = self.client.get('/edit/authors/bulk/update/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.context['formset'].forms), 2)
+
+        data = self._formset_data([
+            {'id': a.pk, 'name': 'Randall Munroe (xkcd)', 'slug': 'randall-munroe'},
+            {'id': b.pk, 'name': 'Scott Rosenberg', 'slug': 'scott-rosenberg'},
+        ], initial=2)
+        res = self.client.post('/edit/authors/bulk/update/', data)
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(str(Author.objects.all()),
+                         "[<Author: Randall Munroe (xkcd)>, <Author: Scott Rosenberg>]")
+
+    def test_bulk_update_invalidates_cache(self):
+        cache.clear()
+        a = Author.objects.create(name='Randall Munroe', slug='randall-munroe')
+        res = self.client.get('/detail/author/%s/cached/' % a.pk)
+        self.assertEqual(res.content, 'This is an Randall Munroe.')
+        data = self._formset_data([
+            {'id': a.pk, 'name': 'Randall Munroe (xkcd)', 'slug': 'randall-munroe'},
+        ], initial=1)
+        res = self.client.post('/edit/authors/bulk/update/', data)
+        self.assertEqual(res.status_code, 302)
+        res = self.client.get('/detail/author/%s/cached/' % a.pk)
+        self.assertEqual(res.content, 'This is an Randall Munroe (xkcd).')
+        cache.clear()
+
     def test_delete(self):
         Author.objects.create(**{'name': 'Randall Munroe', 'slug': 'randall-munroe'})
         res = self.client.get('/edit/author/1/delete/')
@@ -85,3 +142,14 @@ class EditViewTests(TestCase):
         res = self.client.delete('/edit/author/1/delete/')
         self.assertEqual(res.status_code, 302)
         self.assertEqual(str(Author.objects.all()), '[]')
+
+    def _formset_data(self, rows, initial=0):
+        data = {
+            'form-TOTAL_FORMS': str(len(rows)),
+            'form-INITIAL_FORMS': str(initial),
+            'form-MAX_NUM_FORMS': '',
+        }
+        for i, row in enumerate(rows):
+            for key, value in row.items():
+                data['form-%s-%s' % (i, key)] = value
+        return data
@@ -1,6 +1,14 @@
-from class_based_views.tests.models import Author
+from class_based_views import PaginatedListView
+from class_based_views.tests.models import Author, Book
+from class_based_views.tests.utils import RequestFactory
+from class_based_views.tests.views import AuthorList, BookList
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import simplejson
+import base64
 
 class ListViewTests(TestCase):
     fixtures = ['generic-views-test-data.json']
@@ -69,6 +77,77 @@ class ListViewTests(TestCase):
         res = self.client.get('/list/authors/paginated/?page=frog')
         self.assertEqual(res.status_code, 404)
 
+    def test_paginated_cached_count(self):
+        cache.clear()
+        self._make_authors(100)
+        res = self.client.get('/list/authors/paginated/cached_count/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['paginator'].count, 100)
+
+        # The count is stale until the cache expires, but the pages still
+        # show every object.
+        Author.objects.create(name='Author 100', slug='a100')
+        res = self.client.get('/list/authors/paginated/cached_count/', {'page': 'last'})
+        self.assertEqual(res.context['paginator'].count, 100)
+        self.assertEqual(res.context['page_obj'].number, 4)
+        self.assertEqual(len(res.context['authors']), 11)
+        cache.clear()
+
+    def test_paginated_estimated_count(self):
+        # SQLite keeps no row count statistics, so this falls back to the
+        # cached count.
+        cache.clear()
+        self._make_authors(100)
+        res = self.client.get('/list/authors/paginated/estimated_count/', {'page': '4'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['paginator'].count, 100)
+        self.assertEqual(len(res.context['authors']), 10)
+        cache.clear()
+
+    def test_keyset_paginated_queryset(self):
+        self._make_authors(100)
+        res = self.client.get('/list/authors/keyset/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.context['authors']), 30)
+        self.assertEqual(res.context['is_paginated'], True)
+        self.assertEqual(res.context['authors'][0].name, 'Author 00')
+        self.assertEqual(res.context['page_obj'].has_previous(), False)
+        self.assertEqual(res.context['page_obj'].previous_cursor, None)
+
+        names = []
+        while True:
+            names.extend([a.name for a in res.context['authors']])
+            page = res.context['page_obj']
+            if not page.has_next():
+                break
+            res = self.client.get('/list/authors/keyset/', {'page': page.next_cursor})
+            self.assertEqual(res.status_code, 200)
+        self.assertEqual(names, ['Author %02i' % i for i in range(100)])
+        self.assertEqual(len(res.context['authors']), 10)
+        self.assertEqual(res.context['page_obj'].next_cursor, None)
+
+        res = self.client.get('/list/authors/keyset/',
+                              {'page': res.context['page_obj'].previous_cursor})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.context['authors']), 30)
+        self.assertEqual(res.context['authors'][0].name, 'Author 60')
+        self.assertEqual(list(res.context['authors'])[-1].name, 'Author 89')
+        self.assertEqual(res.context['page_obj'].has_next(), True)
+        self.assertEqual(res.context['page_obj'].has_previous(), True)
+
+    def test_keyset_paginated_invalid_cursor(self):
+        self._make_authors(100)
+        res = self.client.get('/list/authors/keyset/?page=frog')
+        self.assertEqual(res.status_code, 404)
+        for cursor in ('["n", 5]', '["n", null]', '["p", "ab"]', '5',
+                       # Wrong types, nulls and nested values.
+                       '["n", ["x", "y"]]', '["n", ["Author 01", "y"]]',
+                       '["n", [null, 1]]', '["n", ["Author 01", null]]',
+                       '["n", [["Author 01"], 1]]', '["n", ["Author 01", {"a": 1}]]'):
+            res = self.client.get('/list/authors/keyset/',
+                                  {'page': base64.urlsafe_b64encode(cursor)})
+            self.assertEqual(res.status_code, 404)
+
     def test_allow_empty_false(self):
         res = self.client.get('/list/authors/notempty/')
         self.assertEqual(res.status_code, 200)
@@ -76,6 +155,74 @@ class ListViewTests(TestCase):
         res = self.client.get('/list/authors/notempty/')
         self.assertEqual(res.status_code, 404)
 
+    def test_allow_empty_false_probes_for_one_row(self):
+        old_debug, settings.DEBUG = settings.DEBUG, True
+        connection.queries = []
+        try:
+            res = self.client.get('/list/authors/notempty/')
+            self.assertEqual(res.status_code, 200)
+            probe = connection.queries[0]['sql']
+        finally:
+            settings.DEBUG = old_debug
+        self.assert_('LIMIT 1' in probe, probe)
+        self.assert_('"name"' not in probe, probe)
+
+    def test_prefetch_related(self):
+        res = self.client.get('/list/books/prefetched/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(res.context['books']), list(Book.objects.all()))
+        for book in res.context['books']:
+            self.assertEqual(book.prefetched_authors, list(book.authors.all()))
+        self.assertEqual([a.name for a in res.context['books'][0].prefetched_authors],
+                         [u'Roberto Bola\xf1o'])
+
+    def test_prefetch_related_stream(self):
+        view = BookList(prefetch_related=['authors'], stream=True)
+        books = list(view.get_context(view.get_queryset())['books'])
+        self.assertEqual(books, list(Book.objects.all()))
+        for book in books:
+            self.assertEqual(book.prefetched_authors, list(book.authors.all()))
+
+    def test_prefetch_related_keyset(self):
+        view = PaginatedListView(queryset=Book.objects.all(), prefetch_related=['authors'],
+                                 paginate_by=1, keyset_pagination=True)
+        view.request, view.kwargs = RequestFactory().get('/'), {}
+        books = view.get_context(view.get_queryset())['books']
+        self.assertEqual(books[0].prefetched_authors, list(books[0].authors.all()))
+
+    def test_rows_keyset(self):
+        view = PaginatedListView(queryset=Author.objects.all(), fields=['name'],
+                                 paginate_by=1, keyset_pagination=True)
+        view.request, view.kwargs = RequestFactory().get('/'), {}
+        self.assertRaises(ImproperlyConfigured, view.get_context, view.get_queryset())
+
+    def test_rows(self):
+        view = AuthorList(fields=['name'])
+        context = view.get_context(view.get_queryset())
+        self.assertEqual(list(context['authors']),
+                         [{'name': u'Roberto Bola\xf1o'}, {'name': 'Scott Rosenberg'}])
+
+        view = AuthorList(fields=['name'], row_mode='only')
+        authors = list(view.get_context(view.get_queryset())['authors'])
+        self.assertEqual([a.pk for a in authors], [1, 2])
+        self.assertEqual(authors[1].name, 'Scott Rosenberg')
+
+        view = AuthorList(fields=['name', 'slug'], row_mode='slots')
+        authors = view.get_context(view.get_queryset())['authors']
+        self.assertEqual(len(authors), 2)
+        self.assertEqual([(a.name, a.slug) for a in authors],
+                         [(u'Roberto Bola\xf1o', 'roberto-bolano'),
+                          ('Scott Rosenberg', 'scott-rosenberg')])
+        self.assertEqual(repr(authors[1]),
+                         "<AuthorRow: name=u'Scott Rosenberg', slug=u'scott-rosenberg'>")
+        self.assertEqual(list(view.get_context(view.get_queryset())['object_list'].iterator())[0].slug,
+                         'roberto-bolano')
+
+        view = AuthorList(fields=['name'], row_mode='frog')
+        self.assertRaises(ImproperlyConfigured, view.get_context, view.get_queryset())
+        view = BookList(fields=['name'], prefetch_related=['authors'])
+        self.assertRaises(ImproperlyConfigured, view.get_context, view.get_queryset())
+
     def test_template_object_name(self):
         res = self.client.get('/list/authors/template_object_name/')
         self.assertEqual(res.status_code, 200)
@@ -83,11 +230,110 @@ class ListViewTests(TestCase):
         self.assertEqual(list(res.context['author_list']), list(Author.objects.all()))
         self.assert_('authors' not in res.context)
 
+    def test_cached_response(self):
+        cache.clear()
+        res = self.client.get('/list/authors/cached/')
+        self.assertEqual(res.status_code, 200)
+        self.assertTemplateUsed(res, 'tests/list.html')
+        content = res.content
+
+        # Served from the cache: nothing is rendered, and the new author
+        # doesn't show up.
+        Author.objects.create(name='Randall Munroe', slug='randall-munroe')
+        res = self.client.get('/list/authors/cached/', {'other': '1'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, content)
+        self.assertEqual(res.template, None)
+
+        # Parameters named in cache_key_params are part of the key.
+        res = self.client.get('/list/authors/cached/', {'q': '1'})
+        self.assertTemplateUsed(res, 'tests/list.html')
+        self.assertNotEqual(res.content, content)
+        self.assert_('Randall Munroe' in res.content)
+        cache.clear()
+
+    def test_cached_response_json(self):
+        cache.clear()
+        res = self.client.get('/list/authors/cached/json/')
+        self.assertTemplateUsed(res, 'tests/list.html')
+        for kwargs in [{'HTTP_ACCEPT': 'application/json'}, {'data': {'format': 'json'}}]:
+            res = self.client.get('/list/authors/cached/json/', **kwargs)
+            self.assertEqual(res['Content-Type'], 'application/json')
+            self.assertEqual(res['Vary'], 'Accept')
+        res = self.client.get('/list/authors/cached/json/')
+        self.assertEqual(res.template, None)
+        self.assert_(res['Content-Type'].startswith('text/html'))
+        self.assertEqual(res['Vary'], 'Accept')
+        cache.clear()
+
+    def test_json(self):
+        res = self.client.get('/list/authors/json/', HTTP_ACCEPT='application/json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res['Vary'], 'Accept')
+        self.assertEqual(res.template, None)
+        self.assertEqual(simplejson.loads(res.content), {'object_list': [
+            {'name': u'Roberto Bola\xf1o', 'slug': 'roberto-bolano'},
+            {'name': 'Scott Rosenberg', 'slug': 'scott-rosenberg'},
+        ]})
+
+        res = self.client.get('/list/authors/json/', HTTP_ACCEPT='text/html,application/json')
+        self.assertTemplateUsed(res, 'tests/list.html')
+        self.assertEqual(res['Vary'], 'Accept')
+
+        self._make_authors(40)
+        res = self.client.get('/list/authors/paginated/json/', {'format': 'json', 'page': '2'})
+        self.assertEqual(simplejson.loads(res.content), {
+            'object_list': [{'name': 'Author %02i' % i} for i in range(30, 40)],
+            'page': 2,
+            'num_pages': 2,
+            'count': 40,
+        })
+
     def test_missing_items(self):
         self.assertRaises(ImproperlyConfigured, self.client.get, '/list/authors/invalid/')
 
+    def test_stream(self):
+        self._make_authors(3)
+        res = self.client.get('/list/authors/stream/')
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(res._is_string)
+        self.assertEqual(res.content, '<ul><li>1. Author 00</li><li>2. Author 01</li>'
+                                      '<li>3. Author 02.</li></ul>')
+        Author.objects.all().delete()
+        res = self.client.get('/list/authors/stream/')
+        self.assertEqual(res.content, '<ul><li>None</li></ul>')
+        view = AuthorList(stream=True)
+        self.assertFalse(view.get_context(view.get_queryset())['object_list'])
+        view = AuthorList(stream=True, fields=['name'], row_mode='slots')
+        self.assertFalse(view.get_context(view.get_queryset())['object_list'])
+        self._make_authors(1)
+        self.assertTrue(view.get_context(view.get_queryset())['object_list'])
+
+    def test_stream_keeps_transaction(self):
+        # Rendering a streamed response while the request's transaction is
+        # still open, as middleware and the test client do, mustn't end it.
+        self._make_authors(1)
+        res = self.client.get('/list/authors/stream/')
+        self.assertEqual(res.content, '<ul><li>1. Author 00.</li></ul>')
+        res.close()
+        self.assertEqual(Author.objects.count(), 1)
+
     def _make_authors(self, n):
         Author.objects.all().delete()
         for i in range(n):
             Author.objects.create(name='Author %02i' % i, slug='a%s' % i)
 
+
+
+class ListViewStreamTests(TransactionTestCase):
+    urls = 'class_based_views.tests.urls'
+
+    def test_stream_closes_connection(self):
+        Author.objects.create(name='Author 00', slug='a0')
+        res = self.client.get('/list/authors/stream/')
+        self.assertEqual(res.content, '<ul><li>1. Author 00.</li></ul>')
+        self.assertNotEqual(connection.connection, None)
+        # The server closes the response once it's sent.
+        res.close()
+        self.assertEqual(connection.connection, None)
@@ -10,10 +10,22 @@ urlpatterns = patterns('',
     (r'^detail/obj/$',
         views.ObjectDetail.as_view()),
     url(r'^detail/author/(?P<pk>\d+)/$',
-        views.AuthorDetail.as_view(),
+        views.AuthorDetail.as_view(max_queries=1),
         name="author_detail"),
     (r'^detail/author/byslug/(?P<slug>[\w-]+)/$',
         views.AuthorDetail.as_view()),
+    (r'^detail/author/(?P<pk>\d+)/etag/$',
+        views.AuthorDetailWithETag.as_view()),
+    (r'^detail/author/(?P<pk>\d+)/etag/cached/$',
+        views.CachedAuthorDetailWithETag.as_view()),
+    (r'^detail/author/(?P<pk>\d+)/etag/json/$',
+        views.AuthorDetailWithETag.as_view(json_fields=['id', 'name'])),
+    (r'^detail/author/(?P<pk>\d+)/json/$',
+        views.AuthorDetail.as_view(json_fields=['id', 'name'])),
+    (r'^detail/author/(?P<pk>\d+)/cached/$',
+        views.AuthorDetail.as_view(cache_fragments=True)),
+    (r'^detail/book/(?P<pk>\d+)/prefetched/$',
+        views.PlainBookDetail.as_view(prefetch_related=['authors'])),
     (r'^detail/author/invalid/url/$',
         views.AuthorDetail.as_view()),
     (r'^detail/author/invalid/qs/$',
@@ -24,14 +36,27 @@ urlpatterns = patterns('',
         views.AuthorCreate.as_view()),
     (r'^edit/authors/create/restricted/$',
         views.AuthorCreateRestricted.as_view()),
+    (r'^edit/authors/bulk/create/$',
+        views.AuthorBulkCreate.as_view()),
+    (r'^edit/authors/bulk/update/$',
+        views.AuthorBulkUpdate.as_view()),
     (r'^edit/author/(?P<pk>\d+)/update/$',
-        views.AuthorUpdate.as_view()),
+        views.AuthorUpdate.as_view(max_queries=1)),
     (r'^edit/author/(?P<pk>\d+)/delete/$',
         views.AuthorDelete.as_view()),
     
     # ArchiveView
     (r'^dates/books/$',
         views.BookArchive.as_view()),
+    (r'^dates/books/last_modified/$',
+        views.BookArchive.as_view(last_modified_field='pubdate')),
+    (r'^dates/books/last_modified/no_latest/$',
+        views.BookArchive.as_view(last_modified_field='pubdate', num_latest=0,
+                                  template_name='tests/book_archive.html')),
+    (r'^dates/books/rows/$',
+        views.BookArchive.as_view(fields=['name', 'pubdate'])),
+    (r'^dates/books/indexed/$',
+        views.BookIndexedArchive.as_view()),
     (r'^dates/books/invalid/$',
         views.BookArchive.as_view(queryset=None)),
     
@@ -39,18 +64,37 @@ urlpatterns = patterns('',
     (r'^list/dict/$',
         views.DictList.as_view()),
     url(r'^list/authors/$',
-        views.AuthorList.as_view(),
+        views.AuthorList.as_view(max_queries=1),
         name="authors_list"),
+    (r'^list/authors/json/$',
+        views.AuthorList.as_view(json_fields=['name', 'slug'])),
+    (r'^list/authors/paginated/json/$',
+        views.PaginatedAuthorList.as_view(paginate_by=30, json_fields=['name'])),
+    (r'^list/authors/cached/$',
+        views.CachedAuthorList.as_view()),
+    (r'^list/authors/cached/json/$',
+        views.CachedAuthorList.as_view(json_fields=['name'])),
+    (r'^list/books/prefetched/$',
+        views.BookList.as_view(prefetch_related=['authors'])),
     (r'^list/authors/paginated/$', 
         views.PaginatedAuthorList.as_view(paginate_by=30)),
     (r'^list/authors/paginated/(?P<page>\d+)/$', 
         views.PaginatedAuthorList.as_view(paginate_by=30)),
+    (r'^list/authors/paginated/cached_count/$',
+        views.PaginatedAuthorList.as_view(paginate_by=30, count_strategy='cached')),
+    (r'^list/authors/paginated/estimated_count/$',
+        views.PaginatedAuthorList.as_view(paginate_by=30, count_strategy='estimate')),
+    (r'^list/authors/keyset/$',
+        views.PaginatedAuthorList.as_view(paginate_by=30, keyset_pagination=True)),
     (r'^list/authors/notempty/$',
         views.AuthorList.as_view(allow_empty=False)),
     (r'^list/authors/template_object_name/$', 
         views.AuthorList.as_view(template_object_name='author')),
     (r'^list/authors/invalid/$',
         views.AuthorList.as_view(queryset=None)),
+    (r'^list/authors/stream/$',
+        views.AuthorList.as_view(stream=True,
+                                 template_name='tests/stream_list.html')),
     
     # YearView
     # Mixing keyword and possitional captures below is intentional; the views
@@ -59,22 +103,32 @@ urlpatterns = patterns('',
         views.BookYearArchive.as_view()),
     (r'^dates/books/(?P<year>\d{4})/make_object_list/$', 
         views.BookYearArchive.as_view(make_object_list=True)),
+    (r'^dates/books/(?P<year>\d{4})/last_modified/$',
+        views.BookYearArchive.as_view(last_modified_field='pubdate')),
     (r'^dates/books/(?P<year>\d{4})/allow_empty/$',
         views.BookYearArchive.as_view(allow_empty=True)),
     (r'^dates/books/(?P<year>\d{4})/allow_future/$',
         views.BookYearArchive.as_view(allow_future=True)),
+    (r'^dates/books/(?P<year>\d{4})/indexed/$',
+        views.BookIndexedYearArchive.as_view()),
     (r'^dates/books/no_year/$',
         views.BookYearArchive.as_view()),
 
     # MonthView
     (r'^dates/books/(?P<year>\d{4})/(?P<month>[a-z]{3})/$',
-        views.BookMonthArchive.as_view()),
+        views.BookMonthArchive.as_view(max_queries=2)),
     (r'^dates/books/(?P<year>\d{4})/(?P<month>\d{1,2})/$',
         views.BookMonthArchive.as_view(month_format='%m')),
     (r'^dates/books/(?P<year>\d{4})/(?P<month>[a-z]{3})/allow_empty/$',
         views.BookMonthArchive.as_view(allow_empty=True)),
     (r'^dates/books/(?P<year>\d{4})/(?P<month>[a-z]{3})/allow_future/$',
         views.BookMonthArchive.as_view(allow_future=True)),
+    (r'^dates/books/(?P<year>\d{4})/(?P<month>[a-z]{3})/indexed/$',
+        views.BookIndexedMonthArchive.as_view()),
+    (r'^dates/books/(?P<year>\d{4})/(?P<month>[a-z]{3})/parallel/$',
+        views.BookMonthArchive.as_view(parallel_context=True)),
+    (r'^dates/books/(?P<year>\d{4})/(?P<month>[a-z]{3})/parallel/count/$',
+        views.BookMonthArchiveWithCount.as_view(parallel_context=True, context_threads=2)),
     (r'^dates/books/(?P<year>\d{4})/no_month/$',
         views.BookMonthArchive.as_view()),
 
@@ -90,7 +144,7 @@ urlpatterns = patterns('',
 
     # DayView
     (r'^dates/books/(?P<year>\d{4})/(?P<month>[a-z]{3})/(?P<day>\d{1,2})/$',
-        views.BookDayArchive.as_view()),
+        views.BookDayArchive.as_view(max_queries=2)),
     (r'^dates/books/(?P<year>\d{4})/(?P<month>\d{1,2})/(?P<day>\d{1,2})/$',
         views.BookDayArchive.as_view(month_format='%m')),
     (r'^dates/books/(?P<year>\d{4})/(?P<month>[a-z]{3})/(?P<day>\d{1,2})/allow_empty/$',
@@ -2,8 +2,10 @@ from django.contrib.auth.decorators import login_required
 from django.core.urlresolvers import reverse
 from django.utils.decorators import method_decorator
 
+from class_based_views.base import ResponseCacheMixin
+from class_based_views.dates import DateIndex
 from class_based_views.tests.models import Author, Book
-from class_based_views.tests.forms import AuthorForm
+from class_based_views.tests.forms import AuthorForm, AuthorFormSet
 import class_based_views
 
 class ObjectDetail(class_based_views.DetailView):
@@ -17,6 +19,20 @@ class AuthorDetail(class_based_views.DetailView):
     queryset = Author.objects.all()
 
 
+class AuthorDetailWithETag(AuthorDetail):
+    def get_etag(self, obj):
+        return '%s-%s' % (obj.pk, obj.slug)
+
+
+class CachedAuthorDetailWithETag(ResponseCacheMixin, AuthorDetailWithETag):
+    pass
+
+
+class PlainBookDetail(class_based_views.DetailView):
+    queryset = Book.objects.all()
+    template_name = 'tests/detail.html'
+
+
 class DictList(class_based_views.ListView):
     """A ListView that doesn't use a model."""
     queryset = [
@@ -31,6 +47,15 @@ class AuthorList(class_based_views.ListView):
     template_name = 'tests/list.html'
 
 
+class BookList(class_based_views.ListView):
+    queryset = Book.objects.all()
+    template_name = 'tests/list.html'
+
+
+class CachedAuthorList(ResponseCacheMixin, AuthorList):
+    cache_key_params = ('q',)
+
+
 class PaginatedAuthorList(class_based_views.PaginatedListView):
     queryset = Author.objects.all()
     template_name = 'tests/list.html'
@@ -57,6 +82,23 @@ class AuthorUpdate(class_based_views.UpdateView):
         return reverse('author_detail', args=[obj.id,])
 
 
+class AuthorBulkCreate(class_based_views.BulkCreateView):
+    formset = AuthorFormSet
+    template_name = 'tests/list.html'
+
+    def redirect_to(self, objects):
+        return reverse('authors_list')
+
+
+class AuthorBulkUpdate(class_based_views.BulkUpdateView):
+    queryset = Author.objects.all()
+    formset = AuthorFormSet
+    template_name = 'tests/list.html'
+
+    def redirect_to(self, objects):
+        return reverse('authors_list')
+
+
 class AuthorDelete(class_based_views.DeleteView):
     queryset = Author.objects.all()
     template_name = 'tests/detail.html'
@@ -78,6 +120,12 @@ class BookYearArchive(BookConfig, class_based_views.YearView):
 class BookMonthArchive(BookConfig, class_based_views.MonthView):
     pass
 
+class BookMonthArchiveWithCount(BookMonthArchive):
+    context_providers = ('date_list', 'book_count')
+
+    def provide_book_count(self, queryset, date, date_range):
+        return Book.objects.count()
+
 class BookWeekArchive(BookConfig, class_based_views.WeekView):
     pass
 
@@ -89,3 +137,14 @@ class BookTodayArchive(BookConfig, class_based_views.TodayView):
 
 class BookDetail(BookConfig, class_based_views.DateDetailView):
     pass
+
+book_dates = DateIndex(Book, 'pubdate')
+
+class BookIndexedArchive(BookArchive):
+    date_index = book_dates
+
+class BookIndexedYearArchive(BookYearArchive):
+    date_index = book_dates
+
+class BookIndexedMonthArchive(BookMonthArchive):
+    date_index = book_dates
@@ -1,3 +1,12 @@
+import datetime
+from calendar import timegm
+from django import http
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.fields import FieldDoesNotExist
+from django.utils import simplejson
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
 
 # Stolen from piston http://bitbucket.org/jespern/django-piston/src/tip/piston/utils.py
 def coerce_put_post(request):
@@ -35,3 +44,237 @@ def coerce_put_post(request):
         
     request.PUT = request.POST
 
+def get_not_modified_response(request, etag=None, last_modified=None):
+    """
+    Returns an ``HttpResponseNotModified`` if the validators sent with a GET
+    or HEAD request match the given ETag and last modified datetime, or
+    ``None`` if the response should be sent in full.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since.
+        if etag is None:
+            return None
+        etags = parse_etags(if_none_match)
+        if etag in etags or '*' in etags:
+            return http.HttpResponseNotModified()
+        return None
+    if if_modified_since and last_modified is not None:
+        if_modified_since = parse_http_date_safe(if_modified_since)
+        if if_modified_since and _timestamp(last_modified) <= if_modified_since:
+            return http.HttpResponseNotModified()
+    return None
+
+def set_validator_headers(response, etag=None, last_modified=None):
+    """
+    Set the ``ETag`` and ``Last-Modified`` headers on a response, unless it
+    already has them.
+    """
+    if etag is not None and not response.has_header('ETag'):
+        response['ETag'] = quote_etag(etag)
+    if last_modified is not None and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+
+def prefetch_related_objects(objects, names):
+    """
+    Fetch the many-to-many relations ``names`` for a list of model instances,
+    with one query per relation however many instances there are. The related
+    objects are attached to each instance as a list called
+    ``prefetched_<name>``, so templates can use ``book.prefetched_authors``
+    where ``book.authors.all`` would run a query per book.
+    
+    Returns the instances as a list.
+    """
+    objects = list(objects)
+    if not objects:
+        return objects
+    opts = objects[0]._meta
+    pks = [obj.pk for obj in objects]
+    for name in names:
+        field = opts.get_field(name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        ordering = ['%s%s__%s' % (f.startswith('-') and '-' or '', target, f.lstrip('-'))
+                    for f in field.rel.to._meta.ordering if f != '?']
+        rows = field.rel.through._default_manager.filter(**{
+            '%s__in' % source: pks,
+        }).select_related(target).order_by(*ordering)
+        related = {}
+        for row in rows:
+            related.setdefault(getattr(row, '%s_id' % source), []).append(
+                getattr(row, target))
+        attname = 'prefetched_%s' % name
+        for obj in objects:
+            setattr(obj, attname, related.get(obj.pk, []))
+    return objects
+
+def has_items(items):
+    """
+    Returns ``True`` if ``items`` isn't empty. Querysets are checked with
+    ``exists()``, which runs a ``LIMIT 1`` query unless the queryset already
+    has its results, rather than fetching every row.
+    """
+    if hasattr(items, 'exists'):
+        return items.exists()
+    return len(items) > 0
+
+def wants_json(request):
+    """
+    Returns ``True`` if the request asks for JSON, with a ``format=json``
+    query parameter or with ``application/json`` as the first media type in
+    its ``Accept`` header.
+    """
+    if request.GET.get('format') == 'json':
+        return True
+    accept = request.META.get('HTTP_ACCEPT', '')
+    return accept.split(',')[0].split(';')[0].strip() == 'application/json'
+
+def json_response(data):
+    """
+    Returns a response with ``data`` encoded as compact JSON. Dates, times and
+    decimals are encoded as ``DjangoJSONEncoder`` does.
+    """
+    content = simplejson.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    response = http.HttpResponse(content, mimetype='application/json')
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+def get_json_rows(items, fields):
+    """
+    Get a list of dictionaries holding the given fields of each item. For a
+    queryset this uses ``values()``, so no model instances are created;
+    other items may be dictionaries or objects. As with ``values()``, a
+    foreign key gives the related object's primary key.
+    """
+    if hasattr(items, 'values') and hasattr(items, 'model'):
+        return list(items.values(*fields))
+    return [get_json_row(item, fields) for item in items]
+
+def get_json_row(item, fields):
+    """
+    Get a dictionary holding the given fields of a single dictionary, model
+    instance or other object.
+    """
+    if isinstance(item, dict):
+        return dict([(name, item.get(name)) for name in fields])
+    row = {}
+    for name in fields:
+        attname = name
+        if hasattr(item, '_meta'):
+            try:
+                attname = item._meta.get_field(name).attname
+            except FieldDoesNotExist:
+                pass
+        row[name] = getattr(item, attname, None)
+    return row
+
+class LazyDict(dict):
+    """
+    A dictionary some of whose values are only computed the first time
+    they're looked up, for context entries templates may never use. Add them
+    with ``set_lazy(key, func)``; looking ``key`` up calls ``func()`` and
+    stores its result in its place, so templates and other code reading the
+    dictionary only ever see the value itself.
+    
+    ``dict(lazy)`` and ``some_dict.update(lazy)`` copy the pending functions
+    rather than their values; ``copy()`` and ``update()`` on a ``LazyDict``
+    keep them pending instead.
+    """
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self)
+        self._pending = set()
+        self.update(*args, **kwargs)
+    
+    def set_lazy(self, key, func):
+        dict.__setitem__(self, key, func)
+        self._pending.add(key)
+    
+    def __getitem__(self, key):
+        if key in self._pending:
+            value = dict.__getitem__(self, key)()
+            self[key] = value
+            return value
+        return dict.__getitem__(self, key)
+    
+    def __setitem__(self, key, value):
+        self._pending.discard(key)
+        dict.__setitem__(self, key, value)
+    
+    def __delitem__(self, key):
+        self._pending.discard(key)
+        dict.__delitem__(self, key)
+    
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+    
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return dict.pop(self, key, *default)
+    
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+    
+    def popitem(self):
+        key = iter(self).next()
+        return key, self.pop(key)
+    
+    def clear(self):
+        self._pending.clear()
+        dict.clear(self)
+    
+    def update(self, *args, **kwargs):
+        for other in args + (kwargs,):
+            if isinstance(other, LazyDict):
+                for key in other:
+                    if key in other._pending:
+                        self.set_lazy(key, dict.__getitem__(other, key))
+                    else:
+                        self[key] = dict.__getitem__(other, key)
+            else:
+                for key, value in dict(other).iteritems():
+                    self[key] = value
+    
+    def copy(self):
+        return LazyDict(self)
+    
+    def iteritems(self):
+        for key in self:
+            yield key, self[key]
+    
+    def itervalues(self):
+        for key in self:
+            yield self[key]
+    
+    def items(self):
+        return list(self.iteritems())
+    
+    def values(self):
+        return list(self.itervalues())
+    
+    def __eq__(self, other):
+        return dict(self.iteritems()) == other
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+    
+
+def _timestamp(value):
+    """
+    Helper: convert a date or datetime to seconds since the epoch (UTC).
+    """
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time.min)
+    return timegm(value.utctimetuple())
@@ -0,0 +1,3 @@
+#!/bin/sh
+export PYTHONPATH=.:$PYTHONPATH
+python class_based_views/tests/benchmarks.py "$@"